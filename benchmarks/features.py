@@ -0,0 +1,143 @@
+"""
+Wall time, throughput and peak memory of every feature.
+
+Times every feature of smap.__all__ and calc_features_consumption on
+synthetic meters (see smap/synthetic.py) at the requested resolutions and
+writes the results to a JSON file. Passing the file of an earlier run with
+--compare prints the speedup of every feature against it.
+
+    python -m benchmarks.features --meters 20 --weeks 8 --output results.json
+    python -m benchmarks.features --output new.json --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+import polars as pl
+import smap
+from smap.helpers import calc_features_consumption
+from smap.synthetic import RESOLUTIONS, synthetic_readings
+
+
+def _rss():
+    # Resident set size of this process in bytes, None where /proc is not available
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def measure(function, *args, **kwargs):
+    """
+    Runs a function once while sampling the memory of the process.
+
+    :return: tuple with the wall time in seconds and the peak resident memory
+        above the memory before the call, in bytes (None where unknown)
+    """
+    before = _rss()
+    peak = [before]
+    done = threading.Event()
+
+    def sample():
+        # Polars allocates outside of the Python heap, so tracemalloc would miss it
+        while not done.wait(0.002):
+            rss = _rss()
+            if rss is not None and rss > peak[0]:
+                peak[0] = rss
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        function(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        done.set()
+        sampler.join()
+    peak_rss = max(peak[0], _rss()) if before is not None else None
+    return seconds, (peak_rss - before if before is not None else None)
+
+
+def run(n_meters, n_weeks, resolutions, features, repeat=1):
+    # One record per feature and resolution, with the best of repeat runs
+    results = []
+    for resolution in resolutions:
+        df = synthetic_readings(n_meters, n_weeks, resolution)
+        for name in features:
+            function = calc_features_consumption if name == 'calc_features_consumption' else getattr(smap, name)
+            runs = [measure(function, df, id_col='meter_id') for _ in range(repeat)]
+            seconds = min(seconds for seconds, _ in runs)
+            memory = [peak for _, peak in runs if peak is not None]
+            results.append({
+                'feature': name,
+                'resolution': resolution,
+                'rows': df.height,
+                'seconds': seconds,
+                'rows_per_second': df.height / seconds if seconds > 0 else None,
+                'peak_memory_bytes': min(memory) if memory else None,
+            })
+            print(f"{name:<32}{resolution:>5}{seconds:>10.3f}s{df.height / seconds:>14,.0f} rows/s"
+                  f"{(min(memory) / 2**20 if memory else float('nan')):>10.1f} MB")
+    return results
+
+
+def _commit():
+    # Commit of the working tree the benchmark ran on, None outside a git checkout
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    # Speedup of every feature against the results of an earlier run
+    before = {(r['feature'], r['resolution']): r for r in previous['results']}
+    print(f"\nagainst {previous.get('commit') or 'previous run'}")
+    print(f"{'feature':<32}{'res':>5}{'before':>10}{'after':>10}{'speedup':>10}")
+    for result in results:
+        old = before.get((result['feature'], result['resolution']))
+        if old is None:
+            continue
+        print(f"{result['feature']:<32}{result['resolution']:>5}{old['seconds']:>10.3f}"
+              f"{result['seconds']:>10.3f}{old['seconds'] / result['seconds']:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--meters', type=int, default=10)
+    parser.add_argument('--weeks', type=int, default=4)
+    parser.add_argument('--resolutions', nargs='+', default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument('--features', nargs='+', default=list(smap.__all__) + ['calc_features_consumption'])
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='results file of an earlier run')
+    args = parser.parse_args()
+
+    results = run(args.meters, args.weeks, args.resolutions, args.features, args.repeat)
+    report = {
+        'commit': _commit(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'polars': pl.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'meters': args.meters,
+        'weeks': args.weeks,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,7 @@ setup(
     long_description=open('README.md').read(),  # Long description read from the the readme file
     long_description_content_type='text/markdown',
     url='https://github.com/yourusername/SMAP',  # Replace with the link to your github or project website
-    packages=find_packages(exclude=('tests', 'docs')),
+    packages=find_packages(exclude=('tests', 'docs', 'benchmarks')),
     install_requires=[
         'polars>=0.20.31'  # Replace with the version of Polars you are using or compatible with
 
@@ -0,0 +1,74 @@
+import polars as pl
+from .registry import FEATURES, AGG, DERIVED, resolve
+from .utilities import group_keys, week_keys, with_calendar
+
+
+# features the engine computes by default: everything that is a weekly
+# aggregation of the consumption, or derived from such aggregations
+FUSED_FEATURES = [
+    name for name, feature in FEATURES.items()
+    if feature.stage in (AGG, DERIVED) and all(col == 'cons' for col in feature.inputs)
+]
+
+
+# function inputs a time-series in polars, outputs all requested aggregation and derived features in a single pass
+def calc_features_fused(df, features=None, id_col=None, observed=False, week_key=False):
+    """
+    Takes a DataFrame with a datetime column 'dt' and a consumption column
+    'cons', and returns a DataFrame with one row per week and one column per
+    requested feature. All aggregations are evaluated in a single group_by
+    over the input instead of one scan per feature; derived features are then
+    computed from the aggregated columns.
+
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param features: names of the features to compute, any AGG or DERIVED
+        feature of the registry; defaults to FUSED_FEATURES
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key', see utilities.week_keys
+    :param observed: only return the weeks in which at least one aggregation
+        had rows left after its filter, the weeks the single feature functions
+        return; by default every week of the input is returned
+    :return: Polars DataFrame or LazyFrame with the weekly features, using the
+        same column names as the corresponding functions in module.py
+    """
+    if features is None:
+        features = FUSED_FEATURES
+    plan = resolve(features)
+    unfusable = [feature.name for feature in plan if feature.stage not in (AGG, DERIVED)]
+    if unfusable:
+        raise ValueError(f"Features cannot be fused: {unfusable}")
+    # Add the calendar columns used by the row filters once for all features
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
+    aggregations = [feature for feature in plan if feature.stage == AGG]
+    filters = [feature.row_filter() for feature in aggregations]
+    observed = observed and all(condition is not None for condition in filters)
+    # Group by week and evaluate every aggregation in one pass
+    result_df = df.group_by(group_keys(id_col, week_key=week_key)).agg(
+        [feature.expr() for feature in aggregations]
+        + ([pl.any_horizontal(filters).any().alias('observed')] if observed else [])
+    )
+    if observed:
+        result_df = result_df.filter(pl.col('observed')).drop('observed')
+    return derive_features(result_df, features, id_col=id_col, week_key=week_key)
+
+
+# function inputs the weekly aggregates, outputs the requested derived features
+def derive_features(weekly, features, id_col=None, week_key=False):
+    """
+    Takes a DataFrame with one row per week holding the columns of the AGG
+    features, e.g. a cached result of calc_features_fused, and computes the
+    requested features from it without going back to the raw readings.
+
+    :param weekly: Polars DataFrame or LazyFrame with the weekly aggregates
+    :param features: names of AGG or DERIVED features of the registry
+    :param id_col: optional meter identifier column of the weekly frame
+    :param week_key: whether the weekly frame is keyed by the packed 'week_key'
+    :return: Polars DataFrame or LazyFrame with the group keys and the
+        requested feature columns
+    """
+    # Derived features follow their dependencies in the plan
+    for feature in resolve(features):
+        if feature.stage == DERIVED:
+            weekly = weekly.with_columns(feature.expr())
+    # Keep only the requested features, dependencies were only needed on the way
+    return weekly.select(group_keys(id_col, week_key=week_key) + [FEATURES[name].column for name in features])
@@ -1,134 +1,415 @@
+import glob
+import os
+import time
+import warnings
 import polars as pl
 from smap import * 
+from .engine import calc_features_fused
+from . import module
+from .module import (UDF_CALLS, calc_lowess_peaks, calc_temperature_correlations, calc_weekday_correlations,
+                     calc_wide_peaks)
+from .parallel import map_frames
+from .registry import FEATURES, FUNCTION, resolve
+from .utilities import add_calendar, add_resolution, compact_layout, group_keys
 
-def calc_features_consumption(df):
-    # Add year and week columns
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
-
-    # Calculate basic weekly consumption statistics
-    avg_weekly = c_week(df)  # Calculate average consumption per week
-    max_weekly = s_max(df)   # Calculate maximum consumption per week
-    min_weekly = s_min(df)   # Calculate minimum consumption per week
-
-    # Calculate ratios and other derived features for further analysis
-    ratio_mean_max = r_mean_max(df)
-    ratio_min_mean = r_min_mean(df)
-    ratio_night_mean = r_night_mean(df)
-    ratio_morning_noon = r_morning_noon(df)
-    ratio_evening_noon = r_evening_noon(df)
-    ratio_mean_max_no_min = r_mean_max_no_min(df)
-    ratio_evening_noon_no_min = r_evening_noon_no_min(df)
-    ratio_morning_noon_no_min = r_morning_noon_no_min(df)
-    ratio_day_night_no_min = r_day_night_no_min(df)
-    ratio_var_wd_we = r_var_wd_we(df)
-    ratio_min_wd_we = r_min_wd_we(df)
-    ratio_max_wd_we = r_max_wd_we(df)
-    ratio_evening_wd_we = r_evening_wd_we(df)
-    ratio_night_wd_we = r_night_wd_we(df)
-    ratio_noon_wd_we = r_noon_wd_we(df)
-    ratio_morning_wd_we = r_morning_wd_we(df)
-    ratio_afternoon_wd_we = r_afternoon_wd_we(df)
-    ratio_we_night_day = r_we_night_day(df)
-    ratio_we_morning_noon = r_we_morning_noon(df)
-    ratio_we_evening_noon = r_we_evening_noon(df)
-    ratio_wd_night_day = r_wd_night_day(df)
-    ratio_wd_morning_noon = r_wd_morning_noon(df)
-    ratio_wd_evening_noon = r_wd_evening_noon(df)
-
-    max_weekend = s_we_max(df)
-    min_weekend = s_we_min(df)
-    max_weekday = s_wd_max(df)
-    min_weekday = s_wd_min(df)
-
-    correlation_we = s_cor_we(df)
-    correlation_wd = s_cor_wd(df)
-    correlation_wd_we = s_cor_wd_we(df)
-
-    sm_variety = s_sm_variety(df)
-    bg_variety = s_bg_variety(df)
-    day_difference = s_day_diff(df)
-    variance_we = s_var_we(df)
-    variance_wd = s_var_wd(df)
-    difference = s_diff(df)
-    num_peaks = s_num_peaks(df)
-    quartile_1 = s_q1(df)
-    quartile_2 = s_q2(df)
-    quartile_3 = s_q3(df)
-
-    max_avg = c_max_avg(df)
-    min_avg = c_min_avg(df)
-    num_zeros = s_number_zeros(df)
-    num_small_peaks = s_number_small_peaks(df)
-    num_big_peaks = s_number_big_peaks(df)
-
-    morning_avg = c_morning(df)
-    noon_avg = c_noon(df)
-    afternoon_avg = c_afternoon(df)
-    evening_avg = c_evening(df)
-    night_avg = c_night(df)
-    weekday_avg = c_weekday(df)
-    weekend_avg = c_weekend(df)
-    var_weekday = c_var_weekday(df)
-    morning_wd = c_wd_morning(df)
-    noon_wd = c_wd_noon(df)
-    afternoon_wd = c_wd_afternoon(df)
-    evening_wd = c_wd_evening(df)
-    night_wd = c_wd_night(df)
-    var_weekend = c_var_weekend(df)
-    morning_we = c_we_morning(df)
-    noon_we = c_we_noon(df)
-    afternoon_we = c_we_afternoon(df)
-    evening_we = c_we_evening(df)
-    night_we = c_we_night(df)
-    week_no_min = c_week_no_min(df)
-
-    time_above_1kw = t_above_1kw(df)
-    time_above_2kw = t_above_2kw(df)
-    time_above_mean = t_above_mean(df)
-    daily_max_time = t_daily_max(df)
-    daily_min_time = t_daily_min(df)
-
-    # Variance and correlation calculations
-    variance = s_variance(df)
-    correlation = s_cor(df)
-
-    # Temporal features like the first time daily consumption exceeds 1 kW
-    first_time_above_1kw = t_above_1kw(df)
-
-    # Seasonal and autocorrelation features
-    seasonal_var_rem = ts_stl_varRem(df)  # Implement this function if STL decomposition is needed
-    autocorr_mean_3h = ts_acf_mean3h(df)
-    autocorr_mean_3h_wd = ts_acf_mean3h_weekday(df)
-
-    # Peak detection related features
-    wide_peak = t_wide_peaks(df)
-    width_peak = t_width_peaks(df)
-
-    # Combine all features into a single DataFrame
-    features_list = [
-        avg_weekly, max_weekly, min_weekly, ratio_mean_max, ratio_min_mean, ratio_night_mean,
-        ratio_morning_noon, ratio_evening_noon, ratio_mean_max_no_min, ratio_evening_noon_no_min,
-        ratio_morning_noon_no_min, ratio_day_night_no_min, ratio_var_wd_we, ratio_min_wd_we,
-        ratio_max_wd_we, ratio_evening_wd_we, ratio_night_wd_we, ratio_noon_wd_we, ratio_morning_wd_we,
-        ratio_afternoon_wd_we, ratio_we_night_day, ratio_we_morning_noon, ratio_we_evening_noon,
-        ratio_wd_night_day, ratio_wd_morning_noon, ratio_wd_evening_noon, max_weekend, min_weekend,
-        max_weekday, min_weekday, correlation_we, correlation_wd, correlation_wd_we,
-        sm_variety, bg_variety, day_difference, variance_we, variance_wd, difference, num_peaks,
-        quartile_1, quartile_2, quartile_3, max_avg, min_avg, num_zeros, num_small_peaks,
-        num_big_peaks, morning_avg, noon_avg, afternoon_avg, evening_avg, night_avg,
-        weekday_avg, weekend_avg, var_weekday, morning_wd, noon_wd, afternoon_wd,
-        evening_wd, night_wd, var_weekend, morning_we, noon_we, afternoon_we,
-        evening_we, night_we, week_no_min, time_above_1kw, time_above_2kw, time_above_mean,
-        daily_max_time, daily_min_time, variance, correlation, first_time_above_1kw, seasonal_var_rem,
-        autocorr_mean_3h, autocorr_mean_3h_wd, wide_peak, width_peak
-    ]
-
-    # Start with the first DataFrame and join the rest
-    features = features_list[0].clone()
-    for feature_df in features_list[1:]:
-        features = features.join(feature_df, on=['year', 'week'], how="full", coalesce=True)
-
-    return features
\ No newline at end of file
+# columns of the wide feature frame, in the order they have always been returned
+FEATURE_COLUMNS = [
+    'average_cons', 'max_cons', 'min_cons', 'ratio_mean_max', 'ratio_min_mean',
+    'ratio_night_mean', 'ratio_morning_noon', 'ratio_evening_noon', 'ratio_mean_max_no_min',
+    'ratio_evening_noon_no_min', 'ratio_morning_noon_no_min', 'ratio_day_night_no_min',
+    'ratio_var_wd_we', 'ratio_min_wd_we', 'ratio_max_wd_we', 'ratio_evening_wd_we',
+    'ratio_night_wd_we', 'ratio_noon_wd_we', 'ratio_morning_wd_we', 'ratio_afternoon_wd_we',
+    'ratio_we_night_day', 'ratio_we_morning_noon', 'ratio_we_evening_noon', 'ratio_wd_night_day',
+    'ratio_wd_morning_noon', 'ratio_wd_evening_noon', 'max_cons_weekend', 'min_cons_weekend',
+    'max_cons_wd', 'min_cons_wd', 'mean_cor_we', 'mean_cor_wd', 's_cor_wd_we', 's_sm_variety',
+    's_bg_variety', 'weekday_diff', 'cons_variance_we', 'cons_varianc_wd', 'total_abs_diff',
+    'num_peaks', 'lower_quartile', 'median', 'upper_quartile', 'weekly_avg_max', 'weekly_avg_min',
+    's_number_zeros', 'num_small_peaks', 'num_big_peaks', 'average_cons_morning',
+    'average_cons_noon', 'average_cons_afternoon', 'average_cons_evening', 'average_cons_night',
+    'average_cons_wd', 'average_cons_weekend', 'var_cons_wd', 'average_cons_wd_morning',
+    'average_cons_wd_noon', 'average_cons_wd_afternoon', 'average_cons_wd_evening',
+    'average_cons_wd_night', 'var_cons_weekend', 'average_cons_we_morning', 'average_cons_we_noon',
+    'average_cons_we_afternoon', 'average_cons_we_evening', 'average_cons_we_night',
+    'cons_week_no_min', 't_above_1kw', 't_above_2kw', 't_above_mean', 'time_at_max', 'time_at_min',
+    'cons_variance', 'mean_cor', 'ts_stl_varRem', 'ts_acf_mean3h',
+    'acf_mean3h_weekday', 't_wide_peaks', 't_width_peaks'
+]
+
+# features of the full feature set, in the order of FEATURE_COLUMNS
+DEFAULT_FEATURES = [
+    name for column in FEATURE_COLUMNS for name, feature in FEATURES.items() if feature.column == column
+]
+
+# features computed together by one function in module.py, which takes the
+# columns to return
+SHARED_PASSES = {
+    's_cor': calc_weekday_correlations,
+    's_cor_wd': calc_weekday_correlations,
+    's_cor_we': calc_weekday_correlations,
+    's_num_peaks': calc_lowess_peaks,
+    's_number_small_peaks': calc_lowess_peaks,
+    's_number_big_peaks': calc_lowess_peaks,
+    't_wide_peaks': calc_wide_peaks,
+    't_width_peaks': calc_wide_peaks,
+    'w_temp_cor_night': calc_temperature_correlations,
+    'w_temp_cor_daytime': calc_temperature_correlations,
+    'w_temp_cor_evening': calc_temperature_correlations,
+    'w_temp_cor_minima': calc_temperature_correlations,
+    'w_temp_cor_maxima': calc_temperature_correlations,
+    'w_temp_cor_maxmin': calc_temperature_correlations,
+    'w_temp_cor_weekday_weekend': calc_temperature_correlations,
+}
+
+
+def calc_features_consumption(df, id_col=None, features=None, n_workers=None, profile=None, compact=False,
+                              week_key=False):
+    """
+    Takes a DataFrame with a datetime column 'dt' and a consumption column
+    'cons', and returns a DataFrame with the weekly consumption features.
+
+    :param df: Polars DataFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param features: names of the features to compute, any feature of
+        smap.__all__; defaults to DEFAULT_FEATURES. Only these features and
+        the aggregations they are derived from are computed, each once
+    :param n_workers: number of processes the meters (or, without id_col, the
+        calendar years) are sharded over; by default all features are
+        computed in this process
+    :param profile: optional callable receiving a dict for every feature
+        frame of feature_frames, and for their alignment, with its 'name',
+        'columns', 'seconds', 'input_rows', 'output_rows', 'udf_calls' (Python
+        callbacks run), 'udf_weeks' (weeks passed to them) and
+        'estimated_size' (bytes of the output); the frames are then collected
+        one at a time instead of together
+    :param compact: compute the features on Float32 readings and one byte
+        calendar columns (see utilities.compact_layout), which needs less
+        memory at the precision documented in the README
+    :param week_key: key the weeks by the packed ISO 'week_key' instead of
+        'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame with one row per week and one column per feature
+    """
+    if n_workers is not None and n_workers > 1:
+        if profile is not None:
+            raise ValueError("profile cannot be combined with n_workers, the workers run in other processes")
+        return _calc_features_sharded(df, id_col, features, n_workers, compact, week_key)
+    frames = feature_frames(df.lazy(), id_col=id_col, features=features, compact=compact, week_key=week_key)
+    if profile is None:
+        # Evaluate all feature frames together, then line them up on the weeks
+        frames = dict(zip(frames, pl.collect_all(list(frames.values()))))
+        result = align_features(frames, id_col=id_col, week_key=week_key)
+    else:
+        keys = group_keys(id_col, week_key=week_key)
+        frames = {name: _profiled(name, frame.collect, df.height, profile, keys)
+                  for name, frame in frames.items()}
+        result = _profiled('align_features', lambda: align_features(frames, id_col=id_col, week_key=week_key),
+                           sum(frame.height for frame in frames.values()), profile, keys)
+    return result.select(group_keys(id_col, week_key=week_key) + feature_columns(features))
+
+
+def profile_features(df, id_col=None, features=None, compact=False, week_key=False):
+    """
+    Computes the weekly consumption features and reports what every feature
+    frame cost, see the profile parameter of calc_features_consumption.
+
+    :param df: Polars DataFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param features: names of the features to compute, defaults to DEFAULT_FEATURES
+    :param compact: profile the compact layout, see calc_features_consumption
+    :param week_key: key the weeks by the packed ISO 'week_key', see calc_features_consumption
+    :return: tuple with the features DataFrame and a DataFrame with one row per feature frame
+    """
+    records = []
+    result = calc_features_consumption(df, id_col=id_col, features=features, profile=records.append,
+                                       compact=compact, week_key=week_key)
+    return result, pl.DataFrame(records)
+
+
+def feature_columns(features=None):
+    """
+    Columns the given features are returned in, without duplicates.
+
+    :param features: names of features of smap.__all__, defaults to DEFAULT_FEATURES
+    :return: list of column names
+    """
+    if features is None:
+        features = DEFAULT_FEATURES
+    return list(dict.fromkeys(FEATURES[name].column for name in features))
+
+
+def _profiled(name, compute, input_rows, profile, keys):
+    # Run one step of the feature calculation and report its cost
+    calls, weeks = UDF_CALLS['calls'], UDF_CALLS['weeks']
+    start = time.perf_counter()
+    result = compute()
+    seconds = time.perf_counter() - start
+    profile({
+        'name': name,
+        'columns': [col for col in result.columns if col not in keys],
+        'seconds': seconds,
+        'input_rows': input_rows,
+        'output_rows': result.height,
+        'udf_calls': UDF_CALLS['calls'] - calls,
+        'udf_weeks': UDF_CALLS['weeks'] - weeks,
+        'estimated_size': result.estimated_size(),
+    })
+    return result
+
+
+def _calc_features_sharded(df, id_col, features, n_workers, compact, week_key):
+    # Features of shards of whole meters (or calendar years) computed on a
+    # process pool; a few shards per worker even out meters of different sizes
+    partition = _partition(id_col, week_key)
+    counts = df.group_by(partition.alias('partition')).agg(pl.len().alias('rows')).sort('partition')
+    rows_per_shard = max(1, -(-df.height // (4 * n_workers)))
+    shards = [df.filter(_selected(partition, values)) for values in _chunks(counts, rows_per_shard)]
+    args = (id_col, features, None, None, compact, week_key)
+    results = map_frames(calc_features_consumption, shards, n_workers, args=args)
+    return pl.concat(results, how='vertical_relaxed').sort(group_keys(id_col, week_key=week_key))
+
+
+# rough peak memory of the feature calculation per input row, as a multiple of
+# the size of the row itself
+WORKING_SET_FACTOR = 16
+
+
+def calc_features_parquet(source, destination, id_col=None, features=None, memory_budget=2**30, compact=False,
+                          week_key=False):
+    """
+    Out-of-core version of calc_features_consumption for Parquet datasets too
+    large to load at once. The input is cut into chunks of whole meters (or,
+    without id_col, whole years) that fit in the memory budget; the features
+    of each chunk are written to their own file in the destination directory
+    before the next chunk is read.
+
+    The partition column of every file is scanned once to find the rows each
+    file holds per meter, and a chunk then only reads the files holding its
+    meters. Files clustered by meter, e.g. one file per group of meters or a
+    hive layout by meter, are therefore read about once in total; a file
+    mixing all meters is read again by every chunk.
+
+    :param source: path, glob or list of paths of the Parquet files with 'dt' and 'cons' columns
+    :param destination: directory the feature files are written to
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param features: names of the features to compute, defaults to DEFAULT_FEATURES
+    :param memory_budget: approximate number of bytes a chunk may take while
+        its features are computed
+    :param compact: read the chunks in the compact layout of
+        utilities.compact_layout, see calc_features_consumption
+    :param week_key: key the weeks by the packed 'week_key', see calc_features_consumption
+    :return: list with the paths of the written files, which can be read back
+        together with pl.scan_parquet(os.path.join(destination, '*.parquet'))
+    """
+    files = _parquet_files(source)
+    # 8 bytes per value; a single meter or year larger than this still makes one chunk
+    columns = pl.scan_parquet(files[0]).columns
+    rows_per_chunk = max(1, memory_budget // (8 * len(columns) * WORKING_SET_FACTOR))
+    partition = _partition(id_col, week_key)
+    # Rows of every partition value in every file, from one pass over the partition column
+    counts = pl.concat([
+        pl.scan_parquet(path).group_by(partition.alias('partition')).agg(pl.len().alias('rows'))
+        .with_columns(pl.lit(number).alias('file'))
+        for number, path in enumerate(files)
+    ]).collect(streaming=True)
+    totals = counts.group_by('partition').agg(pl.col('rows').sum()).sort('partition')
+    os.makedirs(destination, exist_ok=True)
+    paths = []
+    for values in _chunks(totals, rows_per_chunk):
+        holding = counts.filter(_selected(pl.col('partition'), values))['file'].unique().sort()
+        chunk = pl.scan_parquet([files[number] for number in holding]).filter(_selected(partition, values))
+        if compact:
+            chunk = compact_layout(chunk)
+        path = os.path.join(destination, f'part-{len(paths):05d}.parquet')
+        calc_features_consumption(chunk.collect(), id_col=id_col, features=features,
+                                  compact=compact, week_key=week_key).write_parquet(path)
+        paths.append(path)
+    return paths
+
+
+def _parquet_files(source):
+    # Paths of the Parquet files of a path, a glob or a list of paths
+    if isinstance(source, (list, tuple)):
+        return [str(path) for path in source]
+    files = sorted(glob.glob(str(source), recursive=True))
+    if not files:
+        raise FileNotFoundError(f"No Parquet files found at {source}")
+    return files
+
+
+def _partition(id_col, week_key=False):
+    # Expression splitting the readings into parts whose weekly features are
+    # independent: meters, or the years that are part of the week keys
+    if id_col is not None:
+        return pl.col(id_col)
+    return pl.col('dt').dt.iso_year() if week_key else pl.col('dt').dt.year()
+
+
+def _selected(partition, values):
+    # Rows of the given partition values, null included
+    selected = partition.is_in([value for value in values if value is not None])
+    if None in values:
+        selected = selected | partition.is_null()
+    return selected
+
+
+def _chunks(counts, rows_per_chunk):
+    # Consecutive partition values grouped into chunks of at most rows_per_chunk rows
+    chunk, rows = [], 0
+    for value, n in counts.iter_rows():
+        if chunk and rows + n > rows_per_chunk:
+            yield chunk
+            chunk, rows = [], 0
+        chunk.append(value)
+        rows += n
+    if chunk:
+        yield chunk
+
+
+def calc_features_consumption_lazy(df, id_col=None, features=None, compact=False, week_key=False):
+    """
+    Lazy version of calc_features_consumption. The features are combined into
+    a single query plan, so the optimizer sees all of them at once and the
+    input can be a scan (e.g. pl.scan_parquet) that is never fully loaded.
+    Every feature frame is left joined once onto the set of weeks.
+
+    :param df: Polars LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param features: names of the features to compute, defaults to DEFAULT_FEATURES
+    :param compact: compute the features in the compact layout, see calc_features_consumption
+    :param week_key: key the weeks by the packed 'week_key', see calc_features_consumption
+    :return: Polars LazyFrame with one row per week and one column per feature
+    """
+    frames = feature_frames(df, id_col=id_col, features=features, compact=compact, week_key=week_key)
+    keys = group_keys(id_col, week_key=week_key)
+    result = pl.concat([frame.select(keys) for frame in frames.values()]).unique()
+    for frame in frames.values():
+        result = result.join(frame, on=keys, how='left', coalesce=True)
+    return result.select(keys + feature_columns(features))
+
+
+def feature_frames(df, id_col=None, features=None, compact=False, week_key=False):
+    """
+    Computes the weekly frames that together hold the columns of the given
+    features. All aggregations, and the features derived from them, are
+    evaluated in one pass; features sharing a pass in module.py (see
+    SHARED_PASSES) are computed by one call, and every other feature by its
+    own function.
+
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param features: names of features of smap.__all__, defaults to DEFAULT_FEATURES
+    :param compact: keep the readings and calendar columns in the compact
+        layout of utilities.compact_layout while computing the features
+    :param week_key: key the weeks by the packed 'week_key'. The readings are
+        then sorted once by meter and time, and the features group them by a
+        single sorted key, see _meter_weeks
+    :return: dict of the frames by the name of the function computing them,
+        each with the group keys and some of the feature columns
+    """
+    if features is None:
+        features = DEFAULT_FEATURES
+    # Fails on unknown names before anything is computed
+    resolve(features)
+    features = list(dict.fromkeys(features))
+    # Decode the calendar columns and detect the sampling interval of every
+    # meter once, every feature below reuses them
+    if week_key:
+        # Sort the readings once, the packed key of every meter then follows
+        # the order of 'dt'
+        df = df.sort([id_col, 'dt'] if id_col is not None else 'dt')
+    df = add_resolution(add_calendar(df, week_key=week_key), id_col=id_col)
+    meters = None
+    if week_key:
+        # A single sorted key lets Polars group the weeks without hashing
+        df, meters = _meter_weeks(df, id_col)
+    if compact:
+        df = compact_layout(df)
+    # With meter weeks the meter is part of the key
+    by = id_col if meters is None else None
+    frames = {}
+    fused = [name for name in features if FEATURES[name].stage != FUNCTION]
+    if fused:
+        frames['fused'] = calc_features_fused(df, fused, id_col=by, week_key=week_key)
+    shared = {}
+    for name in features:
+        if FEATURES[name].stage != FUNCTION:
+            continue
+        if name in SHARED_PASSES:
+            shared.setdefault(SHARED_PASSES[name], []).append(FEATURES[name].column)
+        else:
+            frames[name] = getattr(module, name)(df, id_col=by, week_key=week_key)
+    for function, columns in shared.items():
+        frames[function.__name__] = function(df, columns=columns, id_col=by, week_key=week_key)
+    if meters is not None:
+        frames = {name: _split_meter_weeks(frame, meters, id_col) for name, frame in frames.items()}
+    return frames
+
+
+# multiplier of the meter number in the meter week keys, above any packed week key
+METER_WEEK_STRIDE = 1_000_000
+
+
+def _meter_weeks(df, id_col):
+    # Readings sorted by (meter, dt) with a 'week_key' that is sorted across
+    # the whole frame: the meter number times METER_WEEK_STRIDE plus the
+    # packed week key. The features then group by this one Int64 column, and
+    # _split_meter_weeks restores the meter and the week key of their rows.
+    # Readings without a meter id are numbered 0, so they keep their own
+    # weeks as they do under the (year, week) keys, and sort first like the
+    # nulls of the sorted readings. Returns the frame and the meters by
+    # number, None for a single series.
+    if id_col is None:
+        return df.set_sorted('week_key'), None
+    number = pl.col(id_col).rank('dense').fill_null(0).cast(pl.Int64)
+    meters = df.select(pl.col(id_col).unique()).with_columns(number.alias('meter_number'))
+    df = df.with_columns((number * METER_WEEK_STRIDE + pl.col('week_key')).alias('week_key'))
+    return df.set_sorted('week_key'), meters
+
+
+def _split_meter_weeks(frame, meters, id_col):
+    # Meter and packed week key of a frame keyed by the meter week keys of _meter_weeks
+    frame = frame.with_columns(
+        (pl.col('week_key') // METER_WEEK_STRIDE).alias('meter_number'),
+        (pl.col('week_key') % METER_WEEK_STRIDE).cast(pl.Int32).alias('week_key'),
+    )
+    frame = frame.join(meters, on='meter_number', how='left', coalesce=True).drop('meter_number')
+    return frame.select([id_col, 'week_key'] + [col for col in frame.columns if col not in (id_col, 'week_key')])
+
+
+# feature frames that only hold some weeks by design: those with readings
+# above a threshold, and weekday features, which skip weeks without weekdays
+SPARSE_FRAMES = ('t_above_1kw', 't_above_2kw', 't_daily_max', 't_daily_min', 'ts_acf_mean3h_weekday')
+
+
+def align_features(frames, id_col=None, week_key=False):
+    """
+    Combines weekly feature frames into one frame with a row per week. The set
+    of weeks is built once from all frames; frames holding exactly these weeks
+    are attached side by side after sorting, and only frames missing some
+    weeks are left joined onto them. A warning names the frames missing weeks,
+    except those of SPARSE_FRAMES, whose features only exist for some weeks.
+
+    :param frames: dict of Polars DataFrames by name, each with the group keys
+    :param id_col: optional meter identifier column of the frames
+    :param week_key: whether the frames are keyed by the packed 'week_key'
+    :return: Polars DataFrame sorted by the group keys, with the columns of
+        all frames
+    :raises ValueError: naming the frames with more than one row for a week,
+        which could not be aligned without duplicating weeks
+    """
+    keys = group_keys(id_col, week_key=week_key)
+    duplicated = [name for name, frame in frames.items() if frame.select(keys).is_duplicated().any()]
+    if duplicated:
+        raise ValueError(f"Feature frames with more than one row per week: {duplicated}")
+    weeks = pl.concat([frame.select(keys) for frame in frames.values()]).unique().sort(keys)
+    columns = [weeks]
+    mismatched = []
+    for name, frame in frames.items():
+        frame = frame.sort(keys)
+        if not frame.select(keys).equals(weeks):
+            if name not in SPARSE_FRAMES:
+                mismatched.append(name)
+            frame = weeks.join(frame, on=keys, how='left', coalesce=True)
+        columns.append(frame.drop(keys))
+    if mismatched:
+        warnings.warn(f"Feature frames missing weeks, their features are null there: {mismatched}", stacklevel=2)
+    return pl.concat(columns, how='horizontal')
@@ -0,0 +1,74 @@
+import os
+import polars as pl
+from .helpers import calc_features_consumption
+from .utilities import group_keys, with_calendar
+
+
+# function inputs new readings, recomputes the weeks they touch and upserts them into the feature store
+def update_features(df, store, id_col=None):
+    """
+    Adds new readings to a feature store and recomputes only the weeks they
+    touch. The store is a directory holding the readings and the features of
+    every (year, week) in a Parquet file of its own (readings/2023-01.parquet
+    and features/2023-01.parquet), so a day of new data rewrites a few small
+    files instead of the whole history. Each weekly feature is computed from
+    all readings of its (year, week) group, including those received before,
+    so the recomputed rows equal those of calc_features_consumption over the
+    full history.
+
+    :param df: Polars DataFrame with the new 'dt' and 'cons' readings; readings
+        already in the store for the same timestamp (and meter) are replaced
+    :param store: directory of the feature store, created when missing
+    :param id_col: optional meter identifier column, only the weeks of the
+        meters with new readings are then recomputed
+    :return: Polars DataFrame with the recomputed feature rows
+    """
+    df = with_calendar(df.filter(pl.col('dt').is_not_null()), 'year', 'week')
+    reading_keys = ([id_col] if id_col is not None else []) + ['dt']
+    touched = []
+    for (year, week), new in df.group_by(['year', 'week']):
+        name = _partition(year, week)
+        readings = new.drop(['year', 'week'])
+        path = os.path.join(store, 'readings', name)
+        if os.path.exists(path):
+            readings = pl.concat([pl.read_parquet(path), readings], how='vertical_relaxed')
+            readings = readings.unique(subset=reading_keys, keep='last', maintain_order=True)
+        readings = readings.sort(reading_keys)
+        _write(readings, path)
+        # Only the meters with new readings need their features recomputed
+        if id_col is not None:
+            readings = readings.filter(pl.col(id_col).is_in(new[id_col].unique()))
+        touched.append(readings)
+    if not touched:
+        return pl.DataFrame()
+    # Compute the features of all touched weeks together
+    features = calc_features_consumption(pl.concat(touched, how='vertical_relaxed'), id_col=id_col)
+    keys = group_keys(id_col)
+    for (year, week), rows in features.group_by(['year', 'week']):
+        path = os.path.join(store, 'features', _partition(year, week))
+        if os.path.exists(path):
+            rows = pl.concat([pl.read_parquet(path).join(rows, on=keys, how='anti'), rows], how='vertical_relaxed')
+        _write(rows.sort(keys), path)
+    return features
+
+
+def read_features(store):
+    """
+    Reads the features of a store written by update_features.
+
+    :param store: directory of the feature store
+    :return: Polars LazyFrame with one row per week (and meter)
+    """
+    return pl.scan_parquet(os.path.join(store, 'features', '*.parquet'))
+
+
+def _partition(year, week):
+    # Name of the files holding the readings and features of a (year, week) group
+    return f'{year}-{week:02d}.parquet'
+
+
+def _write(df, path):
+    # Write through a temporary file, so an interrupted update never leaves a partial partition
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.write_parquet(path + '.tmp')
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,348 @@
+import numpy as np
+from functools import lru_cache
+from statsmodels.nonparametric.smoothers_lowess import lowess
+from statsmodels.tsa.seasonal import STL
+from statsmodels.tsa.stattools import acf
+from .parallel import map_shared
+
+# upper bound on the number of elements of the (weeks, points, neighbours)
+# arrays built at once, larger batches are processed in chunks
+BATCH_ELEMENTS = 2 ** 22
+
+
+@lru_cache(maxsize=None)
+def _lowess_neighbourhoods(n, frac):
+    # Neighbour positions and tricube weights of every point of the grid 0..n-1,
+    # chosen exactly as statsmodels' lowess does for sorted, equally spaced x
+    k = int(frac * n + 1e-10)
+    k = min(max(k, 2), n)
+    x = np.arange(n, dtype=np.float64)
+    left = np.empty(n, dtype=np.intp)
+    left_end, right_end = 0, k
+    for i in range(n):
+        while right_end < n and x[i] > (x[left_end] + x[right_end]) / 2.0:
+            left_end += 1
+            right_end += 1
+        left[i] = left_end
+    neighbours = left[:, None] + np.arange(k)
+    x_neighbours = x[neighbours]
+    radius = np.maximum(x - x[left], x[left + k - 1] - x)
+    dist = np.abs(x_neighbours - x[:, None]) / radius[:, None]
+    cube = dist * dist * dist
+    cube = 1.0 - cube
+    tricube = cube * cube * cube
+    return neighbours, x_neighbours, tricube
+
+
+def _residual_weights(y, y_fit):
+    # Bisquare weights of the residuals, per row
+    resid = np.abs(y - y_fit)
+    median = np.median(resid, axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scaled = np.where(median == 0, (resid > 0).astype(np.float64), resid / (6.0 * median))
+    scaled = np.minimum(scaled, 1.0)
+    tmp = 1.0 - scaled * scaled
+    return tmp * tmp
+
+
+def _lowess_chunk(y, frac, it):
+    n = y.shape[1]
+    neighbours, x_neighbours, tricube = _lowess_neighbourhoods(n, frac)
+    x = np.arange(n, dtype=np.float64)
+    y_neighbours = y[:, neighbours]
+    resid_weights = np.ones_like(y)
+    for _ in range(it + 1):
+        # C order keeps every neighbourhood contiguous, so np.sum adds it up
+        # exactly like the 1D sum of statsmodels
+        weights = np.ascontiguousarray(tricube * resid_weights[:, neighbours])
+        reg_ok = np.count_nonzero(weights > 1e-12, axis=2) >= 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weights = weights / np.sum(weights, axis=2, keepdims=True)
+        # The sums are accumulated neighbour by neighbour, in the same order as
+        # statsmodels, so the fit is identical and not only close
+        sum_weighted_x = np.zeros_like(y)
+        for j in range(neighbours.shape[1]):
+            sum_weighted_x += weights[:, :, j] * x_neighbours[:, j]
+        weighted_sqdev_x = np.zeros_like(y)
+        for j in range(neighbours.shape[1]):
+            weighted_sqdev_x += weights[:, :, j] * (x_neighbours[:, j] - sum_weighted_x) ** 2
+        weighted_sqdev_x = np.maximum(weighted_sqdev_x, 1e-12)
+        y_fit = np.zeros_like(y)
+        for j in range(neighbours.shape[1]):
+            p = weights[:, :, j] * (1.0 + (x - sum_weighted_x) * (x_neighbours[:, j] - sum_weighted_x) / weighted_sqdev_x)
+            y_fit += p * y_neighbours[:, :, j]
+        y_fit = np.where(reg_ok, y_fit, y)
+        resid_weights = _residual_weights(y, y_fit)
+    return y_fit
+
+
+def lowess_batch(y, frac, it=3):
+    """
+    Smooths every row of a 2D array with lowess on the grid 0..n-1, giving the
+    same values as statsmodels' lowess(row, np.arange(n), frac=frac, it=it)
+    for rows without missing values. The neighbourhoods and tricube weights
+    depend only on n and frac, so they are computed once for all rows.
+
+    :param y: 2D NumPy array, one series per row
+    :param frac: fraction of the points used for each local regression
+    :param it: number of robustifying iterations
+    :return: 2D NumPy array with the smoothed rows
+    """
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    if y.shape[0] == 0:
+        return y.copy()
+    neighbours = _lowess_neighbourhoods(y.shape[1], frac)[0]
+    chunk = max(1, BATCH_ELEMENTS // neighbours.size)
+    return np.concatenate([_lowess_chunk(y[start:start + chunk], frac, it)
+                           for start in range(0, y.shape[0], chunk)])
+
+
+def count_peaks(smoothed):
+    # Number of local maxima of every row
+    sign_diff = np.diff(np.sign(np.diff(smoothed, axis=1)), axis=1)
+    return np.sum(sign_diff == 2, axis=1)
+
+
+def lowess_peaks(values, starts, lengths, frac):
+    """
+    Counts the peaks of the lowess smoothed series values[start:start + length]
+    for every pair of starts and lengths. Series of the same length are
+    smoothed together with lowess_batch; series with missing values fall back
+    to statsmodels, which drops them before smoothing.
+
+    :param values: 1D NumPy array holding all series back to back
+    :param starts: start index of each series in values
+    :param lengths: length of each series
+    :param frac: fraction of the points used for each local regression
+    :return: 1D NumPy array with the number of peaks of each series
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    lengths = np.broadcast_to(np.asarray(lengths, dtype=np.intp), starts.shape)
+    counts = np.zeros(len(starts), dtype=np.int64)
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        y = values[starts[rows, None] + np.arange(length)]
+        missing = np.isnan(y).any(axis=1)
+        counts[rows[~missing]] = count_peaks(lowess_batch(y[~missing], frac))
+        for row, data in zip(rows[missing], y[missing]):
+            smoothed = lowess(data, np.arange(len(data)), frac=frac)[:, 1]
+            counts[row] = count_peaks(smoothed[None, :])[0]
+    return counts
+
+
+def _padded(values, starts, lengths):
+    # Series values[start:start + length] as rows of a 2D array padded with zeros
+    positions = np.arange(lengths.max())
+    inside = positions < lengths[:, None]
+    index = np.minimum(starts[:, None] + positions, len(values) - 1)
+    return np.where(inside, values[index], 0.0), inside
+
+
+def acf_mean(values, starts, lengths, nlags):
+    """
+    Mean autocorrelation over the lags 1..nlags of every series
+    values[start:start + length], as np.mean(acf(series, nlags=nlags,
+    fft=True)[1:]) with statsmodels. All series are zero padded into one 2D
+    array (in chunks of at most BATCH_ELEMENTS values) and transformed with a
+    single real FFT along the time axis. Series with missing values fall back
+    to statsmodels with missing='conservative'.
+
+    :param values: 1D NumPy array holding all series back to back
+    :param starts: start index of each series in values
+    :param lengths: length of each series
+    :param nlags: highest lag of the autocorrelation
+    :return: 1D NumPy array with the mean autocorrelation of each series
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    lengths = np.asarray(lengths, dtype=np.intp)
+    result = np.full(len(starts), np.nan)
+    if len(starts) == 0:
+        return result
+    # Zero padding up to length + nlags keeps the circular correlation exact for lags <= nlags
+    nfft = 1 << int(lengths.max() + nlags - 1).bit_length()
+    chunk = max(1, BATCH_ELEMENTS // nfft)
+    lags = np.arange(1, nlags + 1)
+    for begin in range(0, len(starts), chunk):
+        rows = slice(begin, begin + chunk)
+        y, inside = _padded(values, starts[rows], lengths[rows])
+        missing = np.isnan(y).any(axis=1)
+        n = lengths[rows]
+        demeaned = np.where(inside, y - (y.sum(axis=1) / n)[:, None], 0.0)
+        spectrum = np.fft.rfft(demeaned, n=nfft, axis=1)
+        acov = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=nfft, axis=1)[:, :nlags + 1]
+        # Only lags below the length of a series exist, as in statsmodels
+        valid = lags < n[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            autocorr = acov[:, 1:] / acov[:, :1]
+            means = np.where(valid, autocorr, 0.0).sum(axis=1) / valid.sum(axis=1)
+        result[rows] = np.where(missing, np.nan, means)
+        for row in np.flatnonzero(missing) + begin:
+            series = values[starts[row]:starts[row] + lengths[row]]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[row] = np.mean(acf(series, nlags=nlags, fft=True, missing='conservative')[1:])
+    return result
+
+
+def _stl_variances(values, starts, lengths, period):
+    # Variance of the STL remainder of every series, fitted one at a time
+    variances = np.empty(len(starts))
+    for i, (start, length) in enumerate(zip(starts, lengths)):
+        remainder = STL(values[start:start + length], period=period).fit().resid
+        variances[i] = np.var(remainder)
+    return variances
+
+
+def _stl_fast_variances(values, starts, lengths, period):
+    # Same as _stl_variances, but the loess smoothers are only evaluated at
+    # every few points and interpolated in between, with a single inner loop
+    variances = np.empty(len(starts))
+    for i, (start, length) in enumerate(zip(starts, lengths)):
+        stl = STL(values[start:start + length], period=period, seasonal_jump=2, trend_jump=10, low_pass_jump=6)
+        variances[i] = np.var(stl.fit(inner_iter=1).resid)
+    return variances
+
+
+def _moving_average_variances(values, starts, lengths, period):
+    # Variance of the remainder of a classical moving average decomposition,
+    # computed for all series of the same length at once
+    variances = np.empty(len(starts))
+    # Centred moving average over one period, a 2 x period average for even periods
+    if period % 2 == 0:
+        window = np.r_[0.5, np.ones(period - 1), 0.5] / period
+    else:
+        window = np.ones(period) / period
+    half = len(window) // 2
+    for length in np.unique(lengths):
+        rows = np.flatnonzero(lengths == length)
+        y = values[starts[rows, None] + np.arange(length)]
+        padded = np.pad(y, ((0, 0), (half, half)))
+        covered = np.pad(np.ones(length), (half, half))
+        # Near the ends the window is cut off and renormalised over the points it covers
+        weight = np.convolve(covered, window, mode='valid')
+        trend = np.lib.stride_tricks.sliding_window_view(padded, len(window), axis=1) @ window / weight
+        detrended = y - trend
+        # Seasonal component: mean of the detrended values at each position in the period
+        position = np.arange(length) % period
+        counts = np.bincount(position, minlength=period)
+        present = counts > 0
+        onehot = position[:, None] == np.arange(period)
+        seasonal = (detrended @ onehot)[:, present] / counts[present]
+        seasonal -= seasonal.mean(axis=1, keepdims=True)
+        index = np.cumsum(present) - 1
+        remainder = detrended - seasonal[:, index[position]]
+        variances[rows] = np.var(remainder, axis=1)
+    return variances
+
+
+# decompositions available to stl_remainder_variance
+STL_METHODS = {
+    'stl': _stl_variances,
+    'stl_fast': _stl_fast_variances,
+    'moving_average': _moving_average_variances,
+}
+
+
+def stl_remainder_variance(values, starts, lengths, period=52, method='stl', n_workers=None):
+    """
+    Variance of the remainder of the seasonal decomposition of every series
+    values[start:start + length]. method='stl' fits statsmodels' STL to each
+    series; method='stl_fast' fits the same STL with interpolated smoothers
+    and a single inner iteration; method='moving_average' uses a classical
+    decomposition with a centred moving average trend and per-position
+    seasonal means, vectorised over all series. The approximations are
+    faster at the cost of accuracy, see benchmarks/stl.py.
+    With n_workers > 1 the series are spread over a process pool that reads
+    them from shared memory (see parallel.map_shared).
+
+    :param values: 1D NumPy array holding all series back to back
+    :param starts: start index of each series in values
+    :param lengths: length of each series
+    :param period: seasonal period of the decomposition
+    :param method: 'stl', 'stl_fast' or 'moving_average'
+    :param n_workers: number of worker processes, None or 1 to run in process
+    :return: 1D NumPy array with the remainder variance of each series
+    """
+    if method not in STL_METHODS:
+        raise ValueError(f"Unknown decomposition method: {method}")
+    function = STL_METHODS[method]
+    starts = np.asarray(starts, dtype=np.intp)
+    lengths = np.asarray(lengths, dtype=np.intp)
+    values = np.asarray(values, dtype=np.float64)
+    if n_workers is None or n_workers <= 1 or len(starts) < 2:
+        return function(values, starts, lengths, period)
+    # A few tasks per worker evens out series of different cost
+    chunks = np.array_split(np.arange(len(starts)), min(len(starts), 4 * n_workers))
+    tasks = [(starts[chunk], lengths[chunk], period) for chunk in chunks]
+    return np.concatenate(map_shared(function, values, tasks, n_workers))
+
+
+def wide_peaks(values, starts, lengths, thresholds):
+    """
+    Runs of consecutive values above the threshold of their series, for every
+    series values[start:start + length], found with one run-length encoding
+    over all series. Runs of a single value are ignored and, as in the R code
+    the features come from, every series starts with a seed run of width 2.
+
+    :param values: 1D NumPy array holding all series back to back
+    :param starts: start index of each series in values
+    :param lengths: length of each series
+    :param thresholds: threshold of each series
+    :return: tuple with the total width of the runs of each series (seed
+        included) and their mean width
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    lengths = np.asarray(lengths, dtype=np.intp)
+    offsets = np.cumsum(lengths) - lengths
+    total = int(lengths.sum())
+    # Gather the series next to each other and mark the first and last value of each
+    index = np.arange(total) - np.repeat(offsets - starts, lengths)
+    above = values[index] > np.repeat(np.asarray(thresholds, dtype=np.float64), lengths)
+    first = np.zeros(total, dtype=bool)
+    first[offsets[lengths > 0]] = True
+    last = np.zeros(total, dtype=bool)
+    last[(offsets + lengths - 1)[lengths > 0]] = True
+    previous_above = np.r_[False, above[:-1]] & ~first
+    next_above = np.r_[above[1:], False] & ~last
+    run_starts = np.flatnonzero(above & ~previous_above)
+    run_ends = np.flatnonzero(above & ~next_above)
+    run_lengths = run_ends - run_starts + 1
+    run_series = np.repeat(np.arange(len(starts)), lengths)[run_starts]
+    wide = run_lengths > 1
+    width = np.bincount(run_series[wide], weights=run_lengths[wide], minlength=len(starts)).astype(np.int64)
+    count = np.bincount(run_series[wide], minlength=len(starts))
+    return 2 + width, (2 + width) / (1 + count)
+
+
+def correlation_matrices(values, starts, lengths):
+    """
+    Pearson correlation matrix between the columns of every block of rows
+    values[start:start + length]. The blocks are zero padded into one 3D array
+    (in chunks of at most BATCH_ELEMENTS values) and all matrices are computed
+    with a single batched matrix product. Columns without variance in a block
+    get NaN correlations, as with pl.corr.
+
+    :param values: 2D NumPy array holding all blocks back to back
+    :param starts: start row of each block in values
+    :param lengths: number of rows of each block
+    :return: 3D NumPy array with the correlation matrix of each block
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    lengths = np.asarray(lengths, dtype=np.intp)
+    n_columns = values.shape[1]
+    result = np.full((len(starts), n_columns, n_columns), np.nan)
+    if len(starts) == 0:
+        return result
+    positions = np.arange(lengths.max())
+    chunk = max(1, BATCH_ELEMENTS // (len(positions) * n_columns))
+    for begin in range(0, len(starts), chunk):
+        rows = slice(begin, begin + chunk)
+        inside = (positions < lengths[rows, None])[:, :, None]
+        index = np.minimum(starts[rows, None] + positions, len(values) - 1)
+        x = np.where(inside, values[index], 0.0)
+        means = x.sum(axis=1, keepdims=True) / lengths[rows, None, None]
+        centred = np.where(inside, x - means, 0.0)
+        covariance = centred.transpose(0, 2, 1) @ centred
+        std = np.sqrt(np.diagonal(covariance, axis1=1, axis2=2))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[rows] = covariance / (std[:, :, None] * std[:, None, :])
+    return result
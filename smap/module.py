@@ -1,475 +1,435 @@
 import polars as pl
 import numpy as np
+from collections import Counter
 from typing import List
 import statsmodels.api as sm
-from statsmodels.nonparametric.smoothers_lowess import lowess
-from statsmodels.tsa.seasonal import STL
-from statsmodels.tsa.stattools import acf
 from datetime import timedelta
-from .utilities import calculate_lags_for_3h
+from .kernels import acf_mean, correlation_matrices, lowess_peaks, stl_remainder_variance, wide_peaks
+from .engine import calc_features_fused
+from .utilities import group_keys, readings, week_keys, with_calendar, with_resolution
 from .decorators import replace_na_with_defaults_decorator
 from .constants import rep_zero, rep_min1
 
 
 # function inputs a time-series in polars, outputs average consumption for each weak 
-def c_week(df):
+def c_week(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average weekly consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekly average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekly average consumption
     """
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Group by year and week and calculate the average consumption
-    weekly_avg = df.group_by(["year", "week"]).agg(
+    weekly_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons')
     )
     return weekly_avg
 
 
 # function inputs a time-series in polars, outputs maximum consumption for each weak 
-def s_max(df):
+def s_max(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with maximum weekly consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekly maximum consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekly maximum consumption
     """
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Group by year and week and calculate the maximum consumption
-    weekly_max = df.group_by(["year", "week"]).agg(
+    weekly_max = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').max().alias('max_cons')
     )
     return weekly_max
 
 
 # function inputs a time-series in polars, outputs minimum consumption for each weak
-def s_min(df):
+def s_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with minimum weekly consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekly minimum consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekly minimum consumption
     """
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Group by year and week and calculate the minimum consumption
-    weekly_min = df.group_by(["year", "week"]).agg(
+    weekly_min = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').min().alias('min_cons')
     )
     return weekly_min
 
 
 # function inputs a time-series in polars, outputs average cons in the morning (6:00–9:59) for each weak
-def c_morning(df):
+def c_morning(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average morning consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with morning average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with morning average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'hour')
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([6, 7, 8, 9]))
     # Group by year and week and calculate the average consumption
-    morning_avg = df.group_by(["year", "week"]).agg(
+    morning_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_morning')
     )
     return morning_avg
 
 
 # function inputs a time-series in polars, outputs average cons at noon (10:00–13:59)
-def c_noon(df):
+def c_noon(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average noon consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with noon average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with noon average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'hour')
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([10, 11, 12, 13]))
     # Group by year and week and calculate the average consumption
-    noon_avg = df.group_by(["year", "week"]).agg(
+    noon_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_noon')
     )
     return noon_avg
 
 
 # function inputs a time-series in polars, outputs average cons in the afternoon (14:00–17:59)
-def c_afternoon(df):
+def c_afternoon(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average afternoon consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with afternoon average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with afternoon average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'hour')
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([14, 15, 16, 17]))
     # Group by year and week and calculate the average consumption
-    afternoon_avg = df.group_by(["year", "week"]).agg(
+    afternoon_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_afternoon')
     )
     return afternoon_avg
 
 
 # function inputs a time-series in polars, outputs average cons in at noon (18:00–21:59)
-def c_evening(df):
+def c_evening(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average evening consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with evening average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with evening average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'hour')
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([18, 19, 20, 21]))
     # Group by year and week and calculate the average consumption
-    evening_avg = df.group_by(["year", "week"]).agg(
+    evening_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_evening')
     )
     return evening_avg
 
 
 # function inputs a time-series in polars, outputs average cons in the night (1:00–5:59)
-def c_night(df):
+def c_night(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average night consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with night average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with night average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'hour')
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([1, 2, 3, 4, 5]))
     # Group by year and week and calculate the average consumption
-    night_avg = df.group_by(["year", "week"]).agg(
+    night_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_night')
     )
     return night_avg
 
 
 # function inputs a time-series in polars, outputs average cons on working days (Monday–Friday)
-def c_weekday(df):
+def c_weekday(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average working days consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with working days average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with working days average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([0, 1, 2, 3, 4]))
     # Group by year and week and calculate the average consumption
-    working_days_avg = df.group_by(["year", "week"]).agg(
+    working_days_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_wd')
     )
     return working_days_avg
 
 
 # function inputs a time-series in polars, outputs variance of cons on working days (Monday–Friday)
-def c_var_weekday(df):
+def c_var_weekday(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average working days consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with working days average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with working days average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([0, 1, 2, 3, 4]))
     # Group by year and week and calculate the average consumption
-    working_days_avg = df.group_by(["year", "week"]).agg(
+    working_days_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').var().alias('var_cons_wd')
     )
     return working_days_avg
 
 
 # function inputs a time-series in polars, outputs variance of cons on working days (Monday–Friday)
-def s_wd_min(df):
+def s_wd_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with minimum working days consumption per week.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with working days minimum consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with working days minimum consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([0, 1, 2, 3, 4]))
     # Group by year and week and calculate the average consumption
-    working_days_avg = df.group_by(["year", "week"]).agg(
+    working_days_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').min().alias('min_cons_wd')
     )
     return working_days_avg
 
 
 # function inputs a time-series in polars, outputs maximum of cons on working days (Monday–Friday)
-def s_wd_max(df):
+def s_wd_max(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with maximum working days consumption for each week.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with working days maximum consumption for each week
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with working days maximum consumption for each week
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([0, 1, 2, 3, 4]))
     # Group by year and week and calculate the average consumption
-    working_days_avg = df.group_by(["year", "week"]).agg(
+    working_days_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').max().alias('max_cons_wd')
     )
     return working_days_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekdays in the morning (6:00–9:59)
-def c_wd_morning(df):
+def c_wd_morning(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average working days morning consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with working days morning average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with working days morning average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([0, 1, 2, 3, 4]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([6, 7, 8, 9]))
     # Group by year and week and calculate the average consumption
-    wd_morning_avg = df.group_by(["year", "week"]).agg(
+    wd_morning_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_wd_morning')
     )
     return wd_morning_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekdays at noon (10:00–13:59)
-def c_wd_noon(df):
+def c_wd_noon(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
     and returns a DataFrame with average working days noon consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with working days noon average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with working days noon average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([0, 1, 2, 3, 4]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([10, 11, 12, 13]))
     # Group by year and week and calculate the average consumption
-    wd_noon_avg = df.group_by(["year", "week"]).agg(
+    wd_noon_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_wd_noon')
     )
     return wd_noon_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekdays in the afternoon (14:00–17:59)
-def c_wd_afternoon(df):
+def c_wd_afternoon(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average working days afternoon
     consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with working days afternoon average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with working days afternoon average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([0, 1, 2, 3, 4]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([14, 15, 16, 17]))
     # Group by year and week and calculate the average consumption
-    wd_afternoon_avg = df.group_by(["year", "week"]).agg(
+    wd_afternoon_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_wd_afternoon')
     )
     return wd_afternoon_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekdays in the evening (18:00–21:59)
-def c_wd_evening(df):
+def c_wd_evening(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average working days evening
     consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with working days evening average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with working days evening average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-        pl.col('dt').dt.hour().alias("hour")  # hour
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([0, 1, 2, 3, 4]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([18, 19, 20, 21]))
     # Group by year and week and calculate the average consumption
-    wd_evening_avg = df.group_by(["year", "week"]).agg(
+    wd_evening_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_wd_evening')
     )
     return wd_evening_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekdays in the night (1:00–5:59)
-def c_wd_night(df):
+def c_wd_night(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average working days night consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with working days night average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with working days night average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-        pl.col('dt').dt.hour().alias("hour")  # hour
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([0, 1, 2, 3, 4]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([1, 2, 3, 4, 5]))
     # Group by year and week and calculate the average consumption
-    wd_night_avg = df.group_by(["year", "week"]).agg(
+    wd_night_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_wd_night')
     )
     return wd_night_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekends (Saturday–Sunday)
-def c_weekend(df):
+def c_weekend(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average weekend consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekend average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekend average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([5, 6]))
     # Group by year and week and calculate the average consumption
-    weekend_avg = df.group_by(["year", "week"]).agg(
+    weekend_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_weekend')
     )
     return weekend_avg
 
 
 # function inputs a time-series in polars, outputs variance cons on weekends (Saturday–Sunday)
-def c_var_weekend(df):
+def c_var_weekend(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with variance of weekend consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with variance of weekend consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with variance of weekend consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([5, 6]))
     # Group by year and week and calculate the variance consumption
-    weekend_avg = df.group_by(["year", "week"]).agg(
+    weekend_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').var().alias('var_cons_weekend')
     )
     return weekend_avg
@@ -477,24 +437,22 @@ def c_var_weekend(df):
 
 # function inputs a time-series in polars, outputs minimum cons on weekends
 # (Saturday–Sunday) for each week
-def s_we_min(df):
+def s_we_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with minimum weekend consumption per week.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with minimum weekend consumption per week
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with minimum weekend consumption per week
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([5, 6]))
     # Group by year and week and calculate the average consumption
-    weekend_avg = df.group_by(["year", "week"]).agg(
+    weekend_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').min().alias('min_cons_weekend')
     )
     return weekend_avg
@@ -502,872 +460,592 @@ def s_we_min(df):
 
 # function inputs a time-series in polars, outputs maximum cons on weekends
 # (Saturday–Sunday) for each week
-def s_we_max(df):
+def s_we_max(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with maximum weekend consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekend maximum consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekend maximum consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([5, 6]))
     # Group by year and week and calculate the maximum consumption
-    weekend_avg = df.group_by(["year", "week"]).agg(
+    weekend_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').max().alias('max_cons_weekend')
     )
     return weekend_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekends in the morning (6:00–9:59)
-def c_we_morning(df):
+def c_we_morning(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average weekend morning consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekend morning average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekend morning average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-        pl.col('dt').dt.hour().alias("hour")  # hour
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([5, 6]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([6, 7, 8, 9]))
     # Group by year and week and calculate the average consumption
-    we_morning_avg = df.group_by(["year", "week"]).agg(
+    we_morning_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_we_morning')
     )
     return we_morning_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekends at noon (10:00–13:59)
-def c_we_noon(df):
+def c_we_noon(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average weekend noon consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekend noon average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekend noon average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-        pl.col('dt').dt.hour().alias("hour")  # hour
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([5, 6]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([10, 11, 12, 13]))
     # Group by year and week and calculate the average consumption
-    we_noon_avg = df.group_by(["year", "week"]).agg(
+    we_noon_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_we_noon')
     )
     return we_noon_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekends in the afternoon (14:00–17:59)
-def c_we_afternoon(df):
+def c_we_afternoon(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average weekend afternoon consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekend afternoon average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekend afternoon average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-        pl.col('dt').dt.hour().alias("hour")  # hour
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([5, 6]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([14, 15, 16, 17]))
     # Group by year and week and calculate the average consumption
-    we_afternoon_avg = df.group_by(["year", "week"]).agg(
+    we_afternoon_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_we_afternoon')
     )
     return we_afternoon_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekends in the evening (18:00–21:59)
-def c_we_evening(df):
+def c_we_evening(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average weekend evening consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekend evening average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekend evening average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-        pl.col('dt').dt.hour().alias("hour")  # hour
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([5, 6]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([18, 19, 20, 21]))
     # Group by year and week and calculate the average consumption
-    we_evening_avg = df.group_by(["year", "week"]).agg(
+    we_evening_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_we_evening')
     )
     return we_evening_avg
 
 
 # function inputs a time-series in polars, outputs average cons on weekends in the night (1:00–5:59)
-def c_we_night(df):
+def c_we_night(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average weekend night consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekend night average consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekend night average consumption
     """
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # weekday
-        pl.col('dt').dt.hour().alias("hour")  # hour
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for working days
     df = df.filter(pl.col('weekday').is_in([5, 6]))
     # Filter for morning hours
     df = df.filter(pl.col('hour').is_in([1, 2, 3, 4, 5]))
     # Group by year and week and calculate the average consumption
-    we_night_avg = df.group_by(["year", "week"]).agg(
+    we_night_avg = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').mean().alias('average_cons_we_night')
     )
     return we_night_avg
 
 
 # function inputs a time-series in polars, outputs average cons for each week minus the minimum consumption for each week
-def c_week_no_min(df):
+def c_week_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with average weekly consumption minus the
     minimum weekly consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekly average consumption minus the minimum
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekly average consumption minus the minimum
         weekly consumption
     """
-    # get the weekly average consumption
-    weekly_avg = c_week(df)
-    # get the minimum weekly consumption
-    weekly_min = s_min(df)
-    # outer join the weekly_avg and weekly_min DataFrames on the year and week columns
-    weekly_avg = weekly_avg.join(weekly_min, on=['year', 'week'], how="full", coalesce=True)
-    # subtract the minimum from the average_cons column of weekly_avg and rename to average_cons_min
-    weekly_avg = weekly_avg.with_columns(
-        (pl.col('average_cons') - pl.col('min_cons')).alias('cons_week_no_min')
-    )
-    # remove the min_cons and average_cons columns
-    weekly_avg = weekly_avg.drop(['min_cons', 'average_cons'])
-    return weekly_avg
+    # Difference of the weekly c_week and s_min aggregates
+    return calc_features_fused(df, ['c_week_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs max cons for each week minus the minimum consumption for each week
-def s_max_no_min(df):
+def s_max_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with maximum weekly consumption minus the
     minimum weekly consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with weekly maximum consumption minus the minimum
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with weekly maximum consumption minus the minimum
         weekly consumption
     """
-    # get the maximum weekly consumption
-    weekly_max = s_max(df)
-    # get the minimum weekly consumption
-    weekly_min = s_min(df)
-    # outer join the weekly_max and weekly_min DataFrames on the year and week columns
-    weekly_max = weekly_max.join(weekly_min, on=['year', 'week'], how="full", coalesce=True)
-    # subtract the minimum from the max_cons column of weekly_max and rename to max_cons_min
-    weekly_max = weekly_max.with_columns(
-        (pl.col('max_cons') - pl.col('min_cons')).alias('cons_max_no_min')
-    )
-    # remove the min_cons and max_cons columns
-    weekly_max = weekly_max.drop(['min_cons', 'max_cons'])
-    return weekly_max
+    # Difference of the weekly s_max and s_min aggregates
+    return calc_features_fused(df, ['s_max_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the output c_evening minus the minimum consumption
-def c_evening_no_min(df):
+def c_evening_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with evening consumption minus the minimum
     consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with evening consumption minus the minimum
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with evening consumption minus the minimum
         consumption
     """
-    evening_avg = c_evening(df)
-    # get the minimum in the cons column of df 
-    evening_min = s_min(df)
-    # outer join the weekly_max and weekly_min DataFrames on the year and week columns
-    evening_avg = evening_avg.join(evening_min, on=['year', 'week'], how="full", coalesce=True)
-    # subtract the minimum from the average_cons_evening column of evening_avg and rename to average_cons_evening_min
-    evening_avg = evening_avg.with_columns( 
-        (pl.col('average_cons_evening') - pl.col('min_cons')).alias('cons_evening_no_min')
-    )   
-    # remove the min_cons and average_cons_evening columns
-    evening_avg = evening_avg.drop(['min_cons', 'average_cons_evening'])
-    return evening_avg
+    # Difference of the weekly c_evening and s_min aggregates
+    return calc_features_fused(df, ['c_evening_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the output c_morning minus the minimum consumption
-def c_morning_no_min(df):
+def c_morning_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with morning consumption minus the minimum
     consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with morning consumption minus the minimum
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with morning consumption minus the minimum
         consumption
     """
-    morning_avg = c_morning(df)
-    # get the minimum in the cons column of df 
-    morning_min = s_min(df)
-    # outer join the weekly_max and weekly_min DataFrames on the year and week columns
-    morning_avg = morning_avg.join(morning_min, on=['year', 'week'], how="full", coalesce=True)
-    # subtract the minimum from the average_cons_morning column of morning_avg and rename to average_cons_morning_min
-    morning_avg = morning_avg.with_columns(
-        (pl.col('average_cons_morning') - pl.col('min_cons')).alias('cons_morning_no_min')
-    )
-    # remove the min_cons and average_cons_morning columns
-    morning_avg = morning_avg.drop(['min_cons', 'average_cons_morning'])
-    return morning_avg
+    # Difference of the weekly c_morning and s_min aggregates
+    return calc_features_fused(df, ['c_morning_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the output c_noon minus the minimum consumption
-def c_noon_no_min(df):
+def c_noon_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with noon consumption minus the minimum
     consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with noon consumption minus the minimum
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with noon consumption minus the minimum
         consumption
     """
-    noon_avg = c_noon(df)
-    # get the minimum in the cons column of df 
-    noon_min = s_min(df)
-    # outer join the weekly_max and weekly_min DataFrames on the year and week columns
-    noon_avg = noon_avg.join(noon_min, on=['year', 'week'], how="full", coalesce=True)
-    # subtract the minimum from the average_cons_noon column of noon_avg and rename to average_cons_noon_min
-    noon_avg = noon_avg.with_columns(
-        (pl.col('average_cons_noon') - pl.col('min_cons')).alias('cons_noon_no_min')
-    )
-    # remove the min_cons and average_cons_noon columns
-    noon_avg = noon_avg.drop(['min_cons', 'average_cons_noon'])
-    return noon_avg
+    # Difference of the weekly c_noon and s_min aggregates
+    return calc_features_fused(df, ['c_noon_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the output c_night minus the minimum consumption
-def c_night_no_min(df):
+def c_night_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with night consumption minus the minimum
     consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with night consumption minus the minimum
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with night consumption minus the minimum
         consumption
     """
-    night_avg = c_night(df)
-    # get the minimum in the cons column of df 
-    night_min = s_min(df)
-    # outer join the weekly_max and weekly_min DataFrames on the year and week columns
-    night_avg = night_avg.join(night_min, on=['year', 'week'], how="full", coalesce=True)
-    # subtract the minimum from the average_cons_night column of night_avg and rename to average_cons_night_min
-    night_avg = night_avg.with_columns(
-        (pl.col('average_cons_night') - pl.col('min_cons')).alias('cons_night_no_min')
-    )
-    # remove the min_cons and average_cons_night columns
-    night_avg = night_avg.drop(['min_cons', 'average_cons_night'])
-    return night_avg
+    # Difference of the weekly c_night and s_min aggregates
+    return calc_features_fused(df, ['c_night_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between c_week and max cons
-def r_mean_max(df):
+def r_mean_max(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the weekly average
     consumption and the maximum consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the weekly average
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the weekly average
         consumption and the maximum consumption
     """
-    # get the weekly average consumption
-    weekly_avg = c_week(df)
-    # get the maximum consumption 
-    weekly_max = s_max(df)
-    # outer join the weekly_avg and weekly_max DataFrames on the year and week columns
-    weekly_avg = weekly_avg.join(weekly_max, on=['year', 'week'], how="full", coalesce=True)
-    # divide the weekly average consumption by the maximum consumption and rename to ratio_mean_max
-    weekly_avg = weekly_avg.with_columns(
-        (pl.col('average_cons') / pl.col('max_cons')).alias('ratio_mean_max')
-    )
-    # remove the max_cons and average_cons columns
-    weekly_avg = weekly_avg.drop(['max_cons', 'average_cons'])
-    return weekly_avg
+    # Ratio of the weekly c_week and s_max aggregates
+    return calc_features_fused(df, ['r_mean_max'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between min cons and c_week
-def r_min_mean(df):
+def r_min_mean(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the minimum
     consumption and the weekly average consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the minimum consumption and
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the minimum consumption and
         the weekly average consumption
     """
-    # get the weekly average consumption
-    weekly_avg = c_week(df)
-    # get the minimum consumption 
-    weekly_min = s_min(df)
-    # outer join the weekly_avg and weekly_min DataFrames on the year and week columns
-    weekly_avg = weekly_avg.join(weekly_min, on=['year', 'week'], how="full", coalesce=True)
-    # divide the minimum consumption by the weekly average consumption and rename to ratio_min_mean
-    weekly_avg = weekly_avg.with_columns(
-        (pl.col('min_cons') / pl.col('average_cons')).alias('ratio_min_mean')
-    )
-    # remove the min_cons and average_cons columns
-    weekly_avg = weekly_avg.drop(['min_cons', 'average_cons'])
-    return weekly_avg
+    # Ratio of the weekly s_min and c_week aggregates
+    return calc_features_fused(df, ['r_min_mean'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between c_night and c_week
-def r_night_mean(df):
+def r_night_mean(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the night consumption
     and the weekly average consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the night consumption and
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the night consumption and
         the weekly average consumption
     """
-    # get the weekly average consumption
-    weekly_avg = c_week(df)
-    # get the night consumption
-    night_avg = c_night(df)
-    # outer join the weekly_avg and night_avg DataFrames on the year and week columns
-    weekly_avg = weekly_avg.join(night_avg, on=['year', 'week'], how="full", coalesce=True)
-    # fill the missing values with 0
-    weekly_avg = weekly_avg.fill_null(0)
-    # divide the night consumption by the weekly average consumption and rename to ratio_night_mean
-    weekly_avg = weekly_avg.with_columns(
-        (pl.col('average_cons_night') / pl.col('average_cons')).alias('ratio_night_mean')
-    )
-    # remove the average_cons column
-    weekly_avg = weekly_avg.drop(['average_cons', 'average_cons_night'])
-    return weekly_avg
+    # Ratio of the weekly c_night and c_week aggregates
+    return calc_features_fused(df, ['r_night_mean'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between c_morning and c_noon
-def r_morning_noon(df):
+def r_morning_noon(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the morning
     consumption and the noon consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the morning consumption and
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the morning consumption and
         the noon consumption
     """
-    # get the morning consumption
-    morning_avg = c_morning(df)
-    # get the noon consumption
-    noon_avg = c_noon(df)
-    # outer join the morning_avg and noon_avg DataFrames on the year and week columns
-    morning_avg = morning_avg.join(noon_avg, on=['year', 'week'], how="full", coalesce=True)
-    # fill the missing values with 0
-    morning_avg = morning_avg.fill_null(0)
-    # divide the morning consumption by the noon consumption and rename to ratio_morning_noon
-    morning_avg = morning_avg.with_columns(
-        (pl.col('average_cons_morning') / pl.col('average_cons_noon')).alias('ratio_morning_noon')
-    )
-    # remove the average_cons column
-    morning_avg = morning_avg.drop(['average_cons_morning', 'average_cons_noon'])
-    return morning_avg
+    # Ratio of the weekly c_morning and c_noon aggregates
+    return calc_features_fused(df, ['r_morning_noon'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between c_evening and c_noon
-def r_evening_noon(df):
+def r_evening_noon(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the evening
     consumption and the noon consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the evening consumption and
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the evening consumption and
         the noon consumption
     """
-    # get the evening consumption
-    evening_avg = c_evening(df)
-    # get the noon consumption
-    noon_avg = c_noon(df)
-    # outer join the evening_avg and noon_avg DataFrames on the year and week columns
-    evening_avg = evening_avg.join(noon_avg, on=['year', 'week'], how="full", coalesce=True)
-    # fill the missing values with 0
-    evening_avg = evening_avg.fill_null(0)
-    # divide the evening consumption by the noon consumption and rename to ratio_evening_noon
-    evening_avg = evening_avg.with_columns(
-        (pl.col('average_cons_evening') / pl.col('average_cons_noon')).alias('ratio_evening_noon')
-    )
-    # remove the average_cons column
-    evening_avg = evening_avg.drop(['average_cons_evening', 'average_cons_noon'])
-    return evening_avg
+    # Ratio of the weekly c_evening and c_noon aggregates
+    return calc_features_fused(df, ['r_evening_noon'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between c_week and s_max with min cons subtracted from both
 @replace_na_with_defaults_decorator(rep_zero, rep_min1)
-def r_mean_max_no_min(df):
+def r_mean_max_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the weekly average
     consumption minus the minimum consumption and the maximum consumption minus
     the minimum consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the weekly average
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the weekly average
         consumption minus the minimum consumption and the maximum consumption
         minus the minimum consumption
     """
-    print("Original df:")
-    print(df)
-    # get the weekly average consumption minus the minimum consumption
-    weekly_avg = c_week_no_min(df)
-    # get the maximum consumption minus the minimum consumption
-    weekly_max = s_max_no_min(df)
-    # outer join the weekly_avg and weekly_max DataFrames on the year and week columns
-    weekly_avg = weekly_avg.join(weekly_max, on=['year', 'week'], how="full", coalesce=True)
-    # divide the weekly average consumption minus the minimum consumption by the maximum consumption minus the minimum consumption and rename to ratio_mean_max_no_min
-    weekly_avg = weekly_avg.with_columns(
-        (pl.col('cons_week_no_min') / pl.col('cons_max_no_min')).alias('ratio_mean_max_no_min')
-    )
-    # remove the max_cons_no_min and cons_no_min columns
-    weekly_avg = weekly_avg.drop(['cons_week_no_min', 'cons_max_no_min'])
-    return weekly_avg
+    # Ratio of the weekly c_week_no_min and s_max_no_min aggregates
+    return calc_features_fused(df, ['r_mean_max_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between c_evening and c_noon with min cons subtracted from both
 @replace_na_with_defaults_decorator(rep_zero, rep_min1)
-def r_evening_noon_no_min(df):
+def r_evening_noon_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the evening
     consumption minus the minimum consumption and the noon consumption minus the
     minimum consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the evening consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the evening consumption
         minus the minimum consumption and the noon consumption minus the minimum
         consumption
     """
-    # get the evening consumption minus the minimum consumption
-    evening_avg = c_evening_no_min(df)
-    # get the noon consumption minus the minimum consumption
-    noon_avg = c_noon_no_min(df)
-    # outer join the evening_avg and noon_avg DataFrames on the year and week columns
-    evening_avg = evening_avg.join(noon_avg, on=['year', 'week'], how="full", coalesce=True)
-    # fill the missing values with 0
-    evening_avg = evening_avg.fill_null(0)
-    # divide the evening consumption minus the minimum consumption by the noon consumption minus the minimum consumption and rename to ratio_evening_noon_no_min
-    evening_avg = evening_avg.with_columns(
-        (pl.col('cons_evening_no_min') / pl.col('cons_noon_no_min')).alias('ratio_evening_noon_no_min')
-    )
-    # remove the cons_evening_no_min and cons_noon_no_min columns
-    evening_avg = evening_avg.drop(['cons_evening_no_min', 'cons_noon_no_min'])
-    return evening_avg
+    # Ratio of the weekly c_evening_no_min and c_noon_no_min aggregates
+    return calc_features_fused(df, ['r_evening_noon_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between c_morning and c_noon with min cons subtracted from both
-def r_morning_noon_no_min(df):
+def r_morning_noon_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the morning
     consumption minus the minimum consumption and the noon consumption minus the
     minimum consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the morning consumption
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the morning consumption
         minus the minimum consumption and the noon consumption minus the minimum
         consumption
     """
-    # get the morning consumption minus the minimum consumption
-    morning_avg = c_morning_no_min(df)
-    # get the noon consumption minus the minimum consumption
-    noon_avg = c_noon_no_min(df)
-    # outer join the morning_avg and noon_avg DataFrames on the year and week columns
-    morning_avg = morning_avg.join(noon_avg, on=['year', 'week'], how="full", coalesce=True)
-    # fill the missing values with 0
-    morning_avg = morning_avg.fill_null(0)
-    # divide the morning consumption minus the minimum consumption by the noon consumption minus the minimum consumption and rename to ratio_morning_noon_no_min
-    morning_avg = morning_avg.with_columns(
-        (pl.col('cons_morning_no_min') / pl.col('cons_noon_no_min')).alias('ratio_morning_noon_no_min')
-    )
-    # remove the cons_morning_no_min and cons_noon_no_min columns
-    morning_avg = morning_avg.drop(['cons_morning_no_min', 'cons_noon_no_min'])
-    return morning_avg
+    # Ratio of the weekly c_morning_no_min and c_noon_no_min aggregates
+    return calc_features_fused(df, ['r_morning_noon_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between c_night and c_week with min cons subtracted from both
-def r_day_night_no_min(df):
+def r_day_night_no_min(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the day consumption
     minus the minimum consumption and the night consumption minus the minimum
     consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the day consumption minus
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the day consumption minus
         the minimum consumption and the night consumption minus the minimum
         consumption
     """
-    # get the day consumption minus the minimum consumption
-    day_avg = c_week_no_min(df)
-    # get the night consumption minus the minimum consumption
-    night_avg = c_night_no_min(df)
-    # outer join the day_avg and night_avg DataFrames on the year and week columns
-    day_avg = day_avg.join(night_avg, on=['year', 'week'], how="full", coalesce=True)
-    # fill the missing values with 0
-    day_avg = day_avg.fill_null(0)
-    # divide the day consumption minus the minimum consumption by the night consumption minus the minimum consumption and rename to ratio_day_night_no_min
-    day_avg = day_avg.with_columns(
-        (pl.col('cons_week_no_min') / pl.col('cons_night_no_min')).alias('ratio_day_night_no_min')
-    )
-    # remove the cons_day_no_min and cons_night_no_min columns
-    day_avg = day_avg.drop(['cons_week_no_min', 'cons_night_no_min'])
-    return day_avg
+    # Ratio of the weekly c_week_no_min and c_night_no_min aggregates
+    return calc_features_fused(df, ['r_day_night_no_min'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the ratio between variance of c_weekday and c_weekend
-def r_var_wd_we(df):
+def r_var_wd_we(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the working day
     consumption and the weekend consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the variance of working day
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the variance of working day
         consumption and the variance of the weekend consumption
     """
-    # get the working day consumption
-    wd_avg = c_var_weekday(df)
-    # get the weekend consumption
-    we_avg = c_var_weekend(df)
-    # outer join the wd_avg and we_avg DataFrames on the year and week columns
-    wd_avg = wd_avg.join(we_avg, on=['year', 'week'], how="full", coalesce=True)
-    # divide the working day consumption by the weekend consumption and rename to ratio_var_wd_we
-    wd_avg = wd_avg.with_columns(
-        (pl.col('var_cons_wd') / pl.col('var_cons_weekend')).alias('ratio_var_wd_we')
-    )
-    # remove the average_cons_wd and average_cons_weekend columns
-    wd_avg = wd_avg.drop(['var_cons_wd', 'var_cons_weekend'])
-    return wd_avg
+    # Ratio of the weekly c_var_weekday and c_var_weekend aggregates
+    return calc_features_fused(df, ['r_var_wd_we'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the Ratio of the minimum
 # weekday / weekend day
-def r_min_wd_we(df):
+def r_min_wd_we(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the working day
     consumption and the weekend consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the minimum of working day
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the minimum of working day
         consumption and the minimum of the weekend consumption
     """
-    # get the working day consumption
-    wd_min = s_wd_min(df)
-    # get the weekend consumption
-    we_min = s_we_min(df)
-    # outer join the wd_avg and we_avg DataFrames on the year and week columns
-    wd_min = wd_min.join(we_min, on=['year', 'week'], how="full", coalesce=True)
-    # divide the working day minimum consumption by the weekend minimum
-    # consumption and rename to ratio_min_wd_we
-    wd_min = wd_min.with_columns(
-        (pl.col('min_cons_wd') / pl.col('min_cons_weekend')).alias('ratio_min_wd_we')
-    )
-    # remove the average_cons_wd and average_cons_weekend columns
-    wd_min = wd_min.drop(['min_cons_wd', 'min_cons_weekend'])
-    return wd_min
+    # Ratio of the weekly s_wd_min and s_we_min aggregates
+    return calc_features_fused(df, ['r_min_wd_we'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the Ratio of the maximum
 # weekday / weekend day
-def r_max_wd_we(df):
+def r_max_wd_we(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the working day
     consumption and the weekend consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between the maximum of working day
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between the maximum of working day
         consumption and the maximum of the weekend consumption
     """
-    # get the working day consumption
-    wd_max = s_wd_max(df)
-    # get the weekend consumption
-    we_max = s_we_max(df)
-    # outer join the wd_avg and we_avg DataFrames on the year and week columns
-    wd_max = wd_max.join(we_max, on=['year', 'week'], how="full", coalesce=True)
-    # divide the working day maximum consumption by the weekend maximum
-    # consumption and rename to ratio_max_wd_we
-    wd_max = wd_max.with_columns(
-        (pl.col('max_cons_wd') / pl.col('max_cons_weekend')).alias('ratio_max_wd_we')
-    )
-    # remove the average_cons_wd and average_cons_weekend columns
-    wd_max = wd_max.drop(['max_cons_wd', 'max_cons_weekend'])
-    return wd_max
+    # Ratio of the weekly s_wd_max and s_we_max aggregates
+    return calc_features_fused(df, ['r_max_wd_we'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the Ratio of consumption
 # during evening, weekday / weekend day
-def r_evening_wd_we(df):
+def r_evening_wd_we(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the working day
     evening consumption and the weekend evening consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between working day evening
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between working day evening
         consumption and the weekend evening consumption
     """
-    # get the working day consumption
-    wd_evening = c_wd_evening(df)
-    # get the weekend consumption
-    we_evening = c_we_evening(df)
-    # outer join the wd_avg and we_avg DataFrames on the year and week columns
-    wd_evening = wd_evening.join(we_evening, on=['year', 'week'], how="full", coalesce=True)
-    # divide the working day maximum consumption by the weekend maximum
-    # consumption and rename to ratio_max_wd_we
-    wd_evening = wd_evening.with_columns(
-        (pl.col('average_cons_wd_evening') / pl.col('average_cons_we_evening')).alias('ratio_evening_wd_we')
-    )
-    # remove the average_cons_wd and average_cons_weekend columns
-    wd_evening = wd_evening.drop(['average_cons_wd_evening', 'average_cons_we_evening'])
-    return wd_evening
+    # Ratio of the weekly c_wd_evening and c_we_evening aggregates
+    return calc_features_fused(df, ['r_evening_wd_we'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the Ratio of consumption at
 # night, weekday / weekend
-def r_night_wd_we(df):
+def r_night_wd_we(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the working day
     night consumption and the weekend night consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between working day night
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between working day night
         consumption and the weekend night consumption
     """
-    # get the working day consumption
-    wd_night = c_wd_night(df)
-    # get the weekend consumption
-    we_night = c_we_night(df)
-    # outer join the wd_avg and we_avg DataFrames on the year and week columns
-    wd_night = wd_night.join(we_night, on=['year', 'week'], how="full", coalesce=True)
-    # divide the working day maximum consumption by the weekend maximum
-    # consumption and rename to ratio_max_wd_we
-    wd_night = wd_night.with_columns(
-        (pl.col('average_cons_wd_night') / pl.col('average_cons_we_night')).alias('ratio_night_wd_we')
-    )
-    # remove the average_cons_wd and average_cons_weekend columns
-    wd_night = wd_night.drop(['average_cons_wd_night', 'average_cons_we_night'])
-    return wd_night
+    # Ratio of the weekly c_wd_night and c_we_night aggregates
+    return calc_features_fused(df, ['r_night_wd_we'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the Ratio between consumption
 # during nonn, weekday / weekend
-def r_noon_wd_we(df):
+def r_noon_wd_we(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the working day
     noon consumption and the weekend noon consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between working day noon
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between working day noon
         consumption and the weekend noon consumption
     """
-    # get the working day consumption
-    wd_noon = c_wd_noon(df)
-    # get the weekend consumption
-    we_noon = c_we_noon(df)
-    # outer join the wd_avg and we_avg DataFrames on the year and week columns
-    wd_noon = wd_noon.join(we_noon, on=['year', 'week'], how="full", coalesce=True)
-    # divide the working day maximum consumption by the weekend maximum
-    # consumption and rename to ratio_max_wd_we
-    wd_noon = wd_noon.with_columns(
-        (pl.col('average_cons_wd_noon') / pl.col('average_cons_we_noon')).alias('ratio_noon_wd_we')
-    )
-    # remove the average_cons_wd and average_cons_weekend columns
-    wd_noon = wd_noon.drop(['average_cons_wd_noon', 'average_cons_we_noon'])
-    return wd_noon
+    # Ratio of the weekly c_wd_noon and c_we_noon aggregates
+    return calc_features_fused(df, ['r_noon_wd_we'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the Ratio between consumption
 # during morning, weekday / weekend
-def r_morning_wd_we(df):
+def r_morning_wd_we(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the working day
     morning consumption and the weekend morning consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between working day morning
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between working day morning
         consumption and the weekend morning consumption
     """
-    # get the working day consumption
-    wd_morning = c_wd_morning(df)
-    # get the weekend consumption
-    we_morning = c_we_morning(df)
-    # outer join the wd_avg and we_avg DataFrames on the year and week columns
-    wd_morning = wd_morning.join(we_morning, on=['year', 'week'], how="full", coalesce=True)
-    # divide the working day maximum consumption by the weekend maximum
-    # consumption and rename to ratio_max_wd_we
-    wd_morning = wd_morning.with_columns(
-        (pl.col('average_cons_wd_morning') / pl.col('average_cons_we_morning')).alias('ratio_morning_wd_we')
-    )
-    # remove the average_cons_wd and average_cons_weekend columns
-    wd_morning = wd_morning.drop(['average_cons_wd_morning', 'average_cons_we_morning'])
-    return wd_morning
+    # Ratio of the weekly c_wd_morning and c_we_morning aggregates
+    return calc_features_fused(df, ['r_morning_wd_we'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the Ratio between consumption
 # during afternoon, weekday / weekend
-def r_afternoon_wd_we(df):
+def r_afternoon_wd_we(df, id_col=None, week_key=False):
     """
     Takes a DataFrame with a datetime column 'dt' and a consumption column
     'cons', and returns a DataFrame with the ratio between the working day
     afternoon consumption and the weekend afternoon consumption.
 
-    :param df: Polars DataFrame with 'dt' and 'cons' columns
-    :return: Polars DataFrame with the ratio between working day afternoon
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the ratio between working day afternoon
         consumption and the weekend afternoon consumption
     """
-    # get the working day consumption
-    wd_afternoon = c_wd_afternoon(df)
-    # get the weekend consumption
-    we_afternoon = c_we_afternoon(df)
-    # outer join the wd_avg and we_avg DataFrames on the year and week columns
-    wd_afternoon = wd_afternoon.join(we_afternoon, on=['year', 'week'], how="full", coalesce=True)
-    # divide the working day maximum consumption by the weekend maximum
-    # consumption and rename to ratio_max_wd_we
-    wd_afternoon = wd_afternoon.with_columns(
-        (pl.col('average_cons_wd_afternoon') / pl.col('average_cons_we_afternoon')).alias('ratio_afternoon_wd_we')
-    )
-    # remove the average_cons_wd and average_cons_weekend columns
-    wd_afternoon = wd_afternoon.drop(['average_cons_wd_afternoon', 'average_cons_we_afternoon'])
-    return wd_afternoon
+    # Ratio of the weekly c_wd_afternoon and c_we_afternoon aggregates
+    return calc_features_fused(df, ['r_afternoon_wd_we'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the Ratio c_we_night / c_we_weekend
-def r_we_night_day(df):
-    we_night = c_we_night(df)
-    we_weekend = c_weekend(df)
-    we_night = we_night.join(we_weekend, on=['year', 'week'], how="full", coalesce=True)
-    we_night = we_night.with_columns(
-        (pl.col('average_cons_we_night') / pl.col('average_cons_weekend')).alias('ratio_we_night_day')
-    )
-    we_night = we_night.drop(['average_cons_we_night', 'average_cons_weekend'])
-    return we_night
+def r_we_night_day(df, id_col=None, week_key=False):
+    # Ratio of the weekly c_we_night and c_weekend aggregates
+    return calc_features_fused(df, ['r_we_night_day'], id_col=id_col, week_key=week_key, observed=True)
 
 
 # function inputs a time-series in polars, outputs the Ratio c_we_morning / c_we_ noon
-def r_we_morning_noon(df):
-    we_morning = c_we_morning(df)
-    we_noon = c_we_noon(df)
-    we_morning = we_morning.join(we_noon, on=['year', 'week'], how="full", coalesce=True)
-    we_morning = we_morning.with_columns(
-        (pl.col('average_cons_we_morning') / pl.col('average_cons_we_noon')).alias('ratio_we_morning_noon')
-    )
-    we_morning = we_morning.drop(['average_cons_we_morning', 'average_cons_we_noon'])
-    return we_morning
+def r_we_morning_noon(df, id_col=None, week_key=False):
+    # Ratio of the weekly c_we_morning and c_we_noon aggregates
+    return calc_features_fused(df, ['r_we_morning_noon'], id_col=id_col, week_key=week_key, observed=True)
 
 
-def r_we_evening_noon(df):
-    we_evening = c_we_evening(df)
-    we_noon = c_we_noon(df)
-    we_evening = we_evening.join(we_noon, on=['year', 'week'], how="full", coalesce=True)
-    we_evening = we_evening.with_columns(
-        (pl.col('average_cons_we_evening') / pl.col('average_cons_we_noon')).alias('ratio_we_evening_noon')
-    )
-    we_evening = we_evening.drop(['average_cons_we_evening', 'average_cons_we_noon'])
-    return we_evening
+def r_we_evening_noon(df, id_col=None, week_key=False):
+    # Ratio of the weekly c_we_evening and c_we_noon aggregates
+    return calc_features_fused(df, ['r_we_evening_noon'], id_col=id_col, week_key=week_key, observed=True)
 
 
-def r_wd_night_day(df):
-    wd_night = c_wd_night(df)
-    wd_day = c_wd_noon(df)
-    wd_night = wd_night.join(wd_day, on=['year', 'week'], how="full", coalesce=True)
-    wd_night = wd_night.with_columns(
-        (pl.col('average_cons_wd_night') / pl.col('average_cons_wd_noon')).alias('ratio_wd_night_day')
-    )
-    wd_night = wd_night.drop(['average_cons_wd_night', 'average_cons_wd_noon'])
-    return wd_night
+def r_wd_night_day(df, id_col=None, week_key=False):
+    # Ratio of the weekly c_wd_night and c_wd_noon aggregates
+    return calc_features_fused(df, ['r_wd_night_day'], id_col=id_col, week_key=week_key, observed=True)
 
 
-def r_wd_morning_noon(df):
-    wd_morning = c_wd_morning(df)
-    wd_noon = c_wd_noon(df)
-    wd_morning = wd_morning.join(wd_noon, on=['year', 'week'], how="full", coalesce=True)
-    wd_morning = wd_morning.with_columns(
-        (pl.col('average_cons_wd_morning') / pl.col('average_cons_wd_noon')).alias('ratio_wd_morning_noon')
-    )
-    wd_morning = wd_morning.drop(['average_cons_wd_morning', 'average_cons_wd_noon'])
-    return wd_morning
+def r_wd_morning_noon(df, id_col=None, week_key=False):
+    # Ratio of the weekly c_wd_morning and c_wd_noon aggregates
+    return calc_features_fused(df, ['r_wd_morning_noon'], id_col=id_col, week_key=week_key, observed=True)
 
 
-def r_wd_evening_noon(df):
-    wd_evening = c_wd_evening(df)
-    wd_noon = c_wd_noon(df)
-    wd_evening = wd_evening.join(wd_noon, on=['year', 'week'], how="full", coalesce=True)
-    wd_evening = wd_evening.with_columns(
-        (pl.col('average_cons_wd_evening') / pl.col('average_cons_wd_noon')).alias('ratio_wd_evening_noon')
-    )
-    wd_evening = wd_evening.drop(['average_cons_wd_evening', 'average_cons_wd_noon'])
-    return wd_evening
+def r_wd_evening_noon(df, id_col=None, week_key=False):
+    # Ratio of the weekly c_wd_evening and c_wd_noon aggregates
+    return calc_features_fused(df, ['r_wd_evening_noon'], id_col=id_col, week_key=week_key, observed=True)
 
 
-def s_sm_variety(df):
+def s_sm_variety(df, id_col=None, week_key=False):
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Calculate the difference in 'cons' and then the 20%-quintile for each group
-    df_variety = df.group_by(["year", "week"]).agg(
+    df_variety = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         [
             pl.col('cons').diff().abs().quantile(0.20).alias('s_sm_variety'),
         ]
@@ -1376,14 +1054,11 @@ def s_sm_variety(df):
 
 
 # 60%-quintile of the deviation from the previous measured value
-def s_bg_variety(df):
+def s_bg_variety(df, id_col=None, week_key=False):
     # Add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Calculate the difference in 'cons' and then the 20%-quintile for each group
-    df_variety = df.group_by(["year", "week"]).agg(
+    df_variety = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         [
             pl.col('cons').diff().abs().quantile(0.60).alias('s_bg_variety')
         ]
@@ -1392,332 +1067,207 @@ def s_bg_variety(df):
 
 
 # Deviation of measured values on weekdays
-def s_day_diff(df):
+def s_day_diff(df, id_col=None, week_key=False):
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),  # year
-        pl.col('dt').dt.week().alias("week"),  # week
-        pl.col('dt').dt.weekday().alias("weekday"),  # day of the week
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for weekdays (Monday=0, ..., Sunday=6)
     weekday_df = df.filter(pl.col('weekday') < 5)
     # Group by year and week, calculate standard deviation of measured values
     # Replace 'value_column' with the name of your measured values column
-    result_df = weekday_df.group_by(["year", "week"]).agg(
+    result_df = weekday_df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').diff().abs().mean().alias('weekday_diff')
     )
     return result_df
 
 
 # Variance
-def s_variance(df):
+def s_variance(df, id_col=None, week_key=False):
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Group by year and week, and calculate the variance of 'cons'
-    result_df = df.group_by(["year", "week"]).agg(
+    result_df = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').var().alias('cons_variance')
     )
     return result_df
 
 
 # Variance on weekdays
-def s_var_wd(df):
+def s_var_wd(df, id_col=None, week_key=False):
     # Add columns for the year, week, and day of the week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for weekdays (Monday=0, ..., Sunday=6)
     weekday_df = df.filter(pl.col('weekday') < 5)
     # Group by year and week, and calculate the variance of 'cons'
-    result_df = weekday_df.group_by(["year", "week"]).agg(
+    result_df = weekday_df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').var().alias('cons_varianc_wd')
     )
     return result_df
 
 
 # Variance on weekends
-def s_var_we(df):
+def s_var_we(df, id_col=None, week_key=False):
     # Add columns for the year, week, and day of the week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday')
     # Filter for weekends (Saturday=5, Sunday=6)
     weekend_df = df.filter(pl.col('weekday') >= 5)
     # Group by year and week, and calculate the variance of 'cons'
-    result_df = weekend_df.group_by(["year", "week"]).agg(
+    result_df = weekend_df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').var().alias('cons_variance_we')
     )
     return result_df
 
 
 # Total of differences from predecessor (absolute value)
-def s_diff(df):
+def s_diff(df, id_col=None, week_key=False):
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Group by year and week, calculate the total absolute difference of 'cons'
-    result_df = df.group_by(["year", "week"]).agg(
+    result_df = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').diff().abs().sum().alias('total_abs_diff')
     )
     return result_df
 
 
-def s_cor(df):
+def s_cor(df, id_col=None, week_key=False):
+    # Mean correlation between consecutive days from Monday to Sunday
+    return calc_weekday_correlations(df, columns=['mean_cor'], id_col=id_col, week_key=week_key)
+
+
+# pairs of ISO weekdays (Monday 1 to Sunday 7) whose correlation over the
+# times of day is averaged by each weekday correlation feature
+WEEKDAY_CORRELATIONS = {
+    'mean_cor': [(1, 2), (2, 3), (3, 4), (4, 5), (5, 6), (6, 7)],
+    'mean_cor_wd': [(1, 2), (2, 3), (3, 4), (4, 5)],
+    'mean_cor_we': [(6, 7)],
+}
+
+
+def calc_weekday_correlations(df, columns=list(WEEKDAY_CORRELATIONS), id_col=None, week_key=False):
+    """
+    Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
+    and returns the weekday correlation features of every week. The readings of
+    each week are reshaped once into a time of day by weekday matrix, the full
+    7x7 correlation matrix between the weekdays is computed for all weeks at
+    once (see kernels.correlation_matrices), and every feature averages its
+    pairs of days from it.
+
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param columns: names of WEEKDAY_CORRELATIONS to compute
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the requested columns per week
+    """
     # Add columns for year, week, weekday, and time
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.time().alias("time")  # Use time directly
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'time')
+    # Reshape data: create a column for each weekday's consumption, filling
+    # the weekdays without a reading at that time of day with 0
+    pivot_df = df.group_by(group_keys(id_col, 'time', week_key=week_key)).agg([
+        pl.col('cons').filter(pl.col('weekday') == i).first().fill_null(0).alias(f'cons_weekday{i}')
+        for i in range(1, 8)
+    ])
+    weeks = pivot_df.group_by(group_keys(id_col, week_key=week_key)).agg([
+        pl.col(f'cons_weekday{i}').cast(pl.Float64) for i in range(1, 8)
     ])
-    # Reshape data: create a column for each weekday's consumption
-    pivot_df = df.pivot(
-        index=['year', 'week', 'time'],
-        columns='weekday',
-        values='cons'
-    ).fill_null(pl.lit(0))  # Fill missing values
-    # Add missing weekday columns if necessary
-    for i in range(7):
-        col_name = f'cons_weekday{i}'
-        if col_name not in pivot_df.columns:
-            pivot_df = pivot_df.with_columns(pl.lit(0).alias(col_name))
-
-    # Ensure the columns are in the correct order
-    ordered_columns = ['year', 'week', 'time'] + [f'cons_weekday{i}' for i in range(7)]
-    pivot_df = pivot_df.select(ordered_columns)
-    # Compute correlations for each pair of days
-    correlations = []
-    correlation_cols = []
-    for i in range(1,6):  # Correlate each day with the next
-        correlation_col = pl.corr(f'cons_weekday{i}', f'cons_weekday{i+1}').alias(f'day{i}_day{i+1}_correlation')
-        correlations.append(correlation_col)
-        correlation_cols.append(f'day{i}_day{i+1}_correlation')
-    # Group by year, week, and time, and aggregate the correlations
-    result_df = pivot_df.group_by(['year', 'week']).agg(correlations)
-    mean_correlation = result_df.select(
-        col_mean = pl.concat_list(correlation_cols).list.mean()
-    )
-    # Final DataFrame with year, week, and mean_correlation
-    final_df = result_df.select(['year', 'week']).with_columns(mean_correlation)
-    final_df = final_df.rename({"col_mean": "mean_cor"})
-    return final_df
 
+    keys = group_keys(id_col, week_key=week_key)
 
-def s_num_peaks(df):
-    # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias('year'),
-        pl.col('dt').dt.week().alias('week')
-    ])
+    def correlations(weeks):
+        days = [_week_series(weeks[f'cons_weekday{i}']) for i in range(1, 8)]
+        _, starts, lengths = days[0]
+        matrices = correlation_matrices(np.column_stack([values for values, _, _ in days]), starts, lengths)
+        return weeks.select(keys).with_columns([
+            pl.Series(col, np.mean([matrices[:, i - 1, j - 1] for i, j in WEEKDAY_CORRELATIONS[col]], axis=0))
+            for col in columns
+        ])
 
-    # Function to apply to each group
-    def calc_peaks(cons: List[pl.Series]):
-        # Check if the group has enough data
-        if len(cons[0]) < 240:
-            return 0
-        # Extract the data
-        data = cons[0].to_numpy()[:240]
-        # Apply lowess smoothing
-        smoothed = lowess(data, np.arange(len(data)), frac=0.02)[:, 1]
-        # Calculate differences, apply sign, and find second differences
-        diff_smoothed = np.diff(smoothed)
-        sign_diff = np.diff(np.sign(diff_smoothed))
-        # Count peaks
-        num_peaks = np.sum(sign_diff == 2)
-        return num_peaks
-
-    # Apply the function to each group and collect results
-    result_df = df.group_by(['year', 'week']).agg([
-        pl.apply(pl.col('cons'), calc_peaks).alias('num_peaks')
-    ])
-    return result_df
+    return _map_weeks(weeks, correlations, {col: pl.Float64 for col in columns}, id_col=id_col, week_key=week_key)
 
 
-def s_q1(df):
+def s_num_peaks(df, id_col=None, week_key=False):
+    # Peaks of the lowess smoothed first 240 readings of each week
+    return calc_lowess_peaks(df, columns=['num_peaks'], id_col=id_col, week_key=week_key)
+
+
+def s_q1(df, id_col=None, week_key=False):
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Group by year and week, calculate the lower quartile of 'cons'
-    result_df = df.group_by(["year", "week"]).agg(
+    result_df = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').quantile(0.25).alias('lower_quartile')
     )
     return result_df
 
 
-def s_q2(df):
+def s_q2(df, id_col=None, week_key=False):
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Group by year and week, calculate the lower quartile of 'cons'
-    result_df = df.group_by(["year", "week"]).agg(
+    result_df = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').quantile(0.5).alias('median')
     )
     return result_df
 
 
-def s_q3(df):
+def s_q3(df, id_col=None, week_key=False):
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Group by year and week, calculate the lower quartile of 'cons'
-    result_df = df.group_by(["year", "week"]).agg(
+    result_df = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('cons').quantile(0.75).alias('upper_quartile')
     )
     return result_df
 
 
-def c_max_avg(df):
+def c_max_avg(df, id_col=None, week_key=False):
     # Add columns for the year, week, and day
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.day().alias("day")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'day')
     # Calculate daily maxima and then average these for each week
-    result_df = df.group_by(["year", "week", "day"]).agg(
+    result_df = df.group_by(group_keys(id_col, "day", week_key=week_key)).agg(
         pl.col('cons').max().alias('daily_max')
-    ).group_by(["year", "week"]).agg(
+    ).group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('daily_max').mean().alias('weekly_avg_max')
     )
     return result_df
 
 
-def c_min_avg(df):
+def c_min_avg(df, id_col=None, week_key=False):
     # Add columns for the year, week, and day
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.day().alias("day")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'day')
     # Calculate daily minima and then average these for each week
-    result_df = df.group_by(["year", "week", "day"]).agg(
+    result_df = df.group_by(group_keys(id_col, "day", week_key=week_key)).agg(
         pl.col('cons').min().alias('daily_min')
-    ).group_by(["year", "week"]).agg(
+    ).group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.col('daily_min').mean().alias('weekly_avg_min')
     )
     return result_df
 
 
 # Number of zero values
-def s_number_zeros(df):
+def s_number_zeros(df, id_col=None, week_key=False):
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
     # Group by year and week, count the number of zeros in 'cons'
-    result_df = df.group_by(["year", "week"]).agg(
+    result_df = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         (pl.col('cons') == 0).sum().alias('s_number_zeros')
     )
     return result_df
 
 
 # Average Correlation between weekdays
-def s_cor_wd(df):
-    # Add columns for year, week, weekday, and time
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.time().alias("time")  # Use time directly
-    ])
-    # Reshape data: create a column for each weekday's consumption
-    pivot_df = df.pivot(
-        index=['year', 'week', 'time'],
-        columns='weekday',
-        values='cons'
-    ).fill_null(pl.lit(0))  # Fill missing values
-    # Add missing weekday columns if necessary
-    for i in range(7):
-        col_name = f'cons_weekday{i}'
-        if col_name not in pivot_df.columns:
-            pivot_df = pivot_df.with_columns(pl.lit(0).alias(col_name))
-
-    # Ensure the columns are in the correct order
-    ordered_columns = ['year', 'week', 'time'] + [f'cons_weekday{i}' for i in range(7)]
-    pivot_df = pivot_df.select(ordered_columns)
-    # Compute correlations for each pair of days
-    correlations = []
-    correlation_cols = []
-    for i in range(1,4):  # Correlate each day with the next
-        correlation_col = pl.corr(f'cons_weekday{i}', f'cons_weekday{i+1}').alias(f'day{i}_day{i+1}_correlation')
-        correlations.append(correlation_col)
-        correlation_cols.append(f'day{i}_day{i+1}_correlation')
-    # Group by year, week, and time, and aggregate the correlations
-    result_df = pivot_df.group_by(['year', 'week']).agg(correlations)
-    mean_correlation = result_df.select(
-        col_mean = pl.concat_list(correlation_cols).list.mean()
-    )
-    # Final DataFrame with year, week, and mean_correlation
-    final_df = result_df.select(['year', 'week']).with_columns(mean_correlation)
-    final_df = final_df.rename({"col_mean": "mean_cor_wd"})
-    return final_df
+def s_cor_wd(df, id_col=None, week_key=False):
+    # Mean correlation between consecutive working days from Monday to Friday
+    return calc_weekday_correlations(df, columns=['mean_cor_wd'], id_col=id_col, week_key=week_key)
+
 
 # Correlation between Sat and Sun
-def s_cor_we(df):
-    # Add columns for year, week, weekday, and time
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.time().alias("time")  # Use time directly
-    ])
-    # Reshape data: create a column for each weekday's consumption
-    pivot_df = df.pivot(
-        index=['year', 'week', 'time'],
-        columns='weekday',
-        values='cons'
-    ).fill_null(pl.lit(0))  # Fill missing values
-    # Add missing weekday columns if necessary
-    for i in range(7):
-        col_name = f'cons_weekday{i}'
-        if col_name not in pivot_df.columns:
-            pivot_df = pivot_df.with_columns(pl.lit(0).alias(col_name))
-
-    # Ensure the columns are in the correct order
-    ordered_columns = ['year', 'week', 'time'] + [f'cons_weekday{i}' for i in range(7)]
-    pivot_df = pivot_df.select(ordered_columns)
-    # Compute correlations for each pair of days
-    correlations = []
-    correlation_cols = []
-    for i in range(5,6):  # Correlate each day with the next
-        correlation_col = pl.corr(f'cons_weekday{i}', f'cons_weekday{i+1}').alias(f'day{i}_day{i+1}_correlation')
-        correlations.append(correlation_col)
-        correlation_cols.append(f'day{i}_day{i+1}_correlation')
-    # Group by year, week, and time, and aggregate the correlations
-    result_df = pivot_df.group_by(['year', 'week']).agg(correlations)
-    mean_correlation = result_df.select(
-        col_mean = pl.concat_list(correlation_cols).list.mean()
-    )
-    # Final DataFrame with year, week, and mean_correlation
-    final_df = result_df.select(['year', 'week']).with_columns(mean_correlation)
-    final_df = final_df.rename({"col_mean": "mean_cor_we"})
-    return final_df
+def s_cor_we(df, id_col=None, week_key=False):
+    # Correlation between Saturday and Sunday
+    return calc_weekday_correlations(df, columns=['mean_cor_we'], id_col=id_col, week_key=week_key)
 
 
-def s_cor_wd_we(df):
+def s_cor_wd_we(df, id_col=None, week_key=False):
     # Add columns for year, week, and weekday
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.time().alias("time")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'time')
     # Group by year and week
     df_weekday = df.filter(
         pl.col("weekday") < 5
@@ -1726,87 +1276,90 @@ def s_cor_wd_we(df):
         pl.col("weekday") >= 5
     )
     # Use conditional aggregation to calculate averages for weekdays and weekends
-    result_df_weekday = df_weekday.group_by(['year', 'week', 'time']).agg(pl.mean('cons').alias('weekday_avg'))
-    result_df_weekend = df_weekend.group_by(['year', 'week', 'time']).agg(pl.mean('cons').alias('weekend_avg'))
-    result_df = result_df_weekday.join(result_df_weekend, on=["year", "week", 'time'], how="full", coalesce=True)
+    result_df_weekday = df_weekday.group_by(group_keys(id_col, 'time', week_key=week_key)).agg(pl.mean('cons').alias('weekday_avg'))
+    result_df_weekend = df_weekend.group_by(group_keys(id_col, 'time', week_key=week_key)).agg(pl.mean('cons').alias('weekend_avg'))
+    result_df = result_df_weekday.join(result_df_weekend, on=group_keys(id_col, 'time', week_key=week_key), how="full", coalesce=True)
     # Calculate the correlation between weekday and weekend averages
-    result_df = result_df.group_by(['year', 'week']).agg(
+    result_df = result_df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.corr('weekday_avg', 'weekend_avg').alias('s_cor_wd_we')
     )
     return result_df
 
 
-def s_number_small_peaks(df):
-    # add 'year' and 'week' columns
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias('year'),
-        pl.col('dt').dt.week().alias('week')
-    ])
-    weekdays = 24*5*4
-
-    # Function to apply to each group
-    def calc_small_peaks(cons: List[pl.Series]):
-        # Check if the group has enough data
-        if len(cons[0]) < 240:
-            return None
-        # Extract the data
-        data = cons[0].to_numpy()[:weekdays]
-        # Apply lowess smoothing
-        smoothed = lowess(data, np.arange(len(data)), frac=0.02)[:, 1]
-        # Calculate differences, apply sign, and find second differences
-        diff_smoothed = np.diff(smoothed)
-        sign_diff = np.diff(np.sign(diff_smoothed))
-        # Count peaks
-        num_peaks = np.sum(sign_diff == 2)
-        return num_peaks
-
-    # Apply the function to each group and collect results
-    result_df = df.group_by(['year', 'week']).agg([
-        pl.apply(pl.col('cons'), calc_small_peaks).alias('num_small_peaks')
-    ])
-    return result_df
+def s_number_small_peaks(df, id_col=None, week_key=False):
+    # Peaks of the lightly smoothed first working days of each week
+    return calc_lowess_peaks(df, columns=['num_small_peaks'], id_col=id_col, week_key=week_key)
 
 
-def s_number_big_peaks(df):
-    # add 'year' and 'week' columns
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias('year'),
-        pl.col('dt').dt.week().alias('week')
-    ])
-    weekdays = 24*5*4
-
-    # Function to apply to each group
-    def calc_big_peaks(cons: List[pl.Series]):
-        # Check if the group has enough data
-        if len(cons[0]) < 240:
-            return None
-        # Extract the data
-        data = cons[0].to_numpy()[:weekdays]
-        # Apply lowess smoothing
-        smoothed = lowess(data, np.arange(len(data)), frac=0.05)[:, 1]
-        # Calculate differences, apply sign, and find second differences
-        diff_smoothed = np.diff(smoothed)
-        sign_diff = np.diff(np.sign(diff_smoothed))
-        # Count peaks
-        num_peaks = np.sum(sign_diff == 2)
-        return num_peaks
-
-    # Apply the function to each group and collect results
-    result_df = df.group_by(['year', 'week']).agg([
-        pl.apply(pl.col('cons'), calc_big_peaks).alias('num_big_peaks')
-    ])
-    return result_df
+def s_number_big_peaks(df, id_col=None, week_key=False):
+    # Peaks of the strongly smoothed first working days of each week
+    return calc_lowess_peaks(df, columns=['num_big_peaks'], id_col=id_col, week_key=week_key)
+
 
+# lowess peak features: minimum duration of readings, duration of the leading
+# readings smoothed and the smoothing fraction; weeks with fewer readings get 0
+# peaks for num_peaks and null for the other two. At 15 minute readings these
+# are the 240 and 24*5*4 readings of the R package
+LOWESS_PEAKS = {
+    'num_peaks': (timedelta(hours=60), timedelta(hours=60), 0.02),
+    'num_small_peaks': (timedelta(hours=60), timedelta(days=5), 0.02),
+    'num_big_peaks': (timedelta(hours=60), timedelta(days=5), 0.05),
+}
 
-def w_temp_cor_overall(df, weather_col='temp'):
+
+def calc_lowess_peaks(df, columns=list(LOWESS_PEAKS), id_col=None, week_key=False):
+    """
+    Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
+    and returns a DataFrame with the number of lowess peaks of every week.
+    The readings of all weeks are collected in one pass and every smoothing
+    fraction is applied to all weeks at once (see kernels.lowess_batch), so
+    s_num_peaks, s_number_small_peaks and s_number_big_peaks can share the work.
+
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param columns: peak columns to compute, keys of LOWESS_PEAKS
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the requested peak counts per week
+    """
+    # Add columns for the year and week, and the sampling interval of every meter
+    df = with_resolution(with_calendar(df, *week_keys(week_key)), id_col=id_col)
+    head = readings(max(LOWESS_PEAKS[col][1] for col in columns), pl.col('resolution').first())
+    weeks = df.group_by(group_keys(id_col, week_key=week_key)).agg(
+        pl.col('cons').cast(pl.Float64).filter(pl.int_range(0, pl.len()) < head).alias('cons'),
+        pl.col('cons').len().alias('n_readings'),
+        pl.col('resolution').first().alias('resolution')
+    )
+
+    keys = group_keys(id_col, week_key=week_key)
+
+    def count(weeks):
+        values, starts, lengths = _week_series(weeks['cons'])
+        n_readings = weeks['n_readings'].to_numpy()
+        resolution = weeks['resolution'].to_numpy()
+        peaks = []
+        for col in columns:
+            min_duration, window, frac = LOWESS_PEAKS[col]
+            enough = n_readings >= readings(min_duration, resolution)
+            window = readings(window, resolution)
+            counts = np.zeros(len(weeks), dtype=np.int64)
+            counts[enough] = lowess_peaks(values, starts[enough], np.minimum(lengths, window)[enough], frac)
+            peaks.append(pl.Series(col, counts, dtype=pl.Int64))
+        result = weeks.select(keys).with_columns(peaks)
+        # Short weeks count no peaks, except for num_peaks which reports 0
+        return result.with_columns([
+            pl.when(pl.Series(n_readings >= readings(LOWESS_PEAKS[col][0], resolution))).then(pl.col(col)).alias(col)
+            for col in columns if col != 'num_peaks'
+        ])
+
+    return _map_weeks(weeks, count, {col: pl.Int64 for col in columns}, id_col=id_col, week_key=week_key)
+
+
+def w_temp_cor_overall(df, weather_col='temp', id_col=None, week_key=False):
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    df = with_calendar(df, *week_keys(week_key))
 
     # Group by year and week, calculate the correlation between temperature and power consumption
-    result_df = df.group_by(["year", "week"]).agg(
+    result_df = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.corr(weather_col, 'cons').alias('temp_cons_cor')
     )
     return result_df
@@ -1826,484 +1379,474 @@ def calc_linear_relationship(args: List[pl.Series]):
     return model.params[1]  # Return the slope coefficient
 
 
+# Expression computing per group the same slope as calc_linear_relationship, without fitting a model
+def linear_slope(x, y):
+    """
+    Slope of the least squares line of y on x, i.e. cov(x, y) / var(x),
+    evaluated natively by Polars inside a group_by. Matches
+    calc_linear_relationship: null when either column holds a null, null
+    when x is a non-zero constant (statsmodels then adds no intercept) and
+    0 when x is all zeros.
+
+    :param x: name of the independent variable column (temperature)
+    :param y: name of the dependent variable column (consumption)
+    :return: Polars expression with the slope coefficient
+    """
+    x, y = pl.col(x), pl.col(y)
+    return (
+        pl.when(x.is_null().any() | y.is_null().any()).then(None)
+        .when(x.max() == x.min()).then(pl.when(x.max() == 0).then(0.0))
+        .otherwise(pl.cov(x, y) / x.var())
+    )
+
+
+# function inputs a time-series in polars, outputs the hourly consumption and temperature used by the w_temp_cor_* features
+def resample_hourly(df, id_col=None, week_key=False):
+    """
+    Takes a DataFrame with a datetime column 'dt', a consumption column 'cons'
+    and a temperature column 'temp', and returns the hourly DataFrame the
+    temperature regressions are fitted on.
+
+    :param df: Polars DataFrame or LazyFrame with 'dt', 'cons' and optionally 'temp' columns
+    :param id_col: optional meter identifier column, the series is then resampled per meter
+    :param week_key: build the windows per packed 'week_key' (an hour never
+        spans two weeks), which keeps the key of every hour, including the
+        sorted meter week keys of helpers.feature_frames
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with hourly 'cons' and, when present, 'temp' columns
+    """
+    by = id_col
+    if week_key:
+        df = with_calendar(df, *week_keys(week_key))
+        by = group_keys(id_col, week_key=week_key)
+        # Windows are built per week, so each week must be sorted by time
+        df = df.sort(by + ['dt'])
+    elif id_col is None:
+        df = df.set_sorted('dt')
+    else:
+        # Windows are built per meter, so each meter must be sorted by time
+        df = df.sort([id_col, 'dt'])
+    hourly = df.group_by_dynamic('dt', every='1h', period='15m', closed='left', group_by=by).agg(
+        [pl.col('cons').sum().alias('cons')] + ([pl.col('temp').first()] if 'temp' in df.columns else [])
+    )
+    return hourly
+
+
 # def w_temp_cor_daily(df):
 #     # Add columns for the year and week
 #     df = df.with_columns([
 #         pl.col('dt').dt.year().alias("year"),
 #         pl.col('dt').dt.week().alias("week")
 #     ])
-#     # Group by year and week and apply the linear regression function
+#     # Group by year and week and compute the slope of the linear relationship
 #     result_df = df.group_by(["year", "week"]).agg(pl.apply(exprs=["temp", "cons"], function=calc_linear_relationship).alias('temp_cons_cor_daily'))
 #     return result_df
 
 
-def w_temp_cor_night(df):
-    df = df.set_sorted('dt').group_by_dynamic('dt', every='1h', period='15m', closed='left').agg(
-        pl.col('cons').sum().alias('cons'),
-        pl.col('temp').first()
-    )
-    # add columns for the year, week, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
-    # Filter for night hours (0:00 - 5:59)
-    df_night = df.filter((pl.col('hour') >= 0) & (pl.col('hour') < 6))
-    # Group by year and week and apply the linear regression function
-    result_df = df_night.group_by(["year", "week"]).agg(pl.apply(exprs=["temp", "cons"], function=calc_linear_relationship).alias('temp_cons_cor_night'))
-    return result_df
+def w_temp_cor_night(df, id_col=None, week_key=False):
+    # Slope of the hourly consumption on the temperature at night
+    return calc_temperature_correlations(df, columns=['temp_cons_cor_night'], id_col=id_col, week_key=week_key)
 
 
-def w_temp_cor_daytime(df):
-    df = df.set_sorted('dt').group_by_dynamic('dt', every='1h', period='15m', closed='left').agg(
-        pl.col('cons').sum().alias('cons'),
-        pl.col('temp').first()
-    )
-    # Add columns for the year, week, day, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
-    # Filter for daytime hours (6:00 - 17:59) from Monday to Friday (0-4)
-    df_daytime = df.filter((pl.col('hour') >= 6) & (pl.col('hour') <= 17) & (pl.col('weekday') < 5))
-    # Group by year, week, and day and apply the linear regression function
-    result_df = df_daytime.group_by(["year", "week"]).agg(pl.apply(exprs=["temp", "cons"], function=calc_linear_relationship).alias('temp_cons_cor_daytime'))
-    return result_df
+def w_temp_cor_daytime(df, id_col=None, week_key=False):
+    # Slope of the hourly consumption on the temperature during weekday daytime
+    return calc_temperature_correlations(df, columns=['temp_cons_cor_daytime'], id_col=id_col, week_key=week_key)
 
 
-def w_temp_cor_evening(df):
-    df = df.set_sorted('dt').group_by_dynamic('dt', every='1h', period='15m', closed='left').agg(
-        pl.col('cons').sum().alias('cons'),
-        pl.col('temp').first()
-    )
-    # Add columns for the year, week, day, and hour
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
-    # Filter for evening hours (18:00 - 23:59) from Monday to Friday (0-4)
-    df_evening = df.filter((pl.col('hour') >= 18) & (pl.col('hour') <= 23))
-    # Group by year, week, and day and apply the linear regression function
-    result_df = df_evening.group_by(["year", "week"]).agg(pl.apply(exprs=["temp", "cons"], function=calc_linear_relationship).alias('temp_cons_cor_evening'))
-    return result_df
-    
+def w_temp_cor_evening(df, id_col=None, week_key=False):
+    # Slope of the hourly consumption on the temperature in the evening
+    return calc_temperature_correlations(df, columns=['temp_cons_cor_evening'], id_col=id_col, week_key=week_key)
 
-def w_temp_cor_minima(df):
-    df = df.set_sorted('dt').group_by_dynamic('dt', every='1h', period='15m', closed='left').agg(
-        pl.col('cons').sum().alias('cons'),
-        pl.col('temp').first()
-    )
-    # Add columns for the year, week, and day
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
-    # Group by year, week, and day and calculate the daily minimum for 'cons' and 'temp'
-    daily_min_df = df.group_by(["year", "week", "weekday"]).agg([
-        pl.col('cons').min().alias('daily_min_cons'),
-        pl.col('temp').min().alias('daily_min_temp')
-    ])
 
-    # Group by year and week and calculate linear relationship between daily minimums
-    def calc_linear_relationship_minima(args: List[pl.Series]):
-        if args[0].is_null().any() or args[1].is_null().any():
-            return None
-        X = sm.add_constant(args[0].to_numpy())  # Independent variable (temperature)
-        y = args[1].to_numpy()  # Dependent variable (consumption)
-        # Fit linear regression model and extract the coefficient
-        model = sm.OLS(y, X, missing='drop').fit()
-        if len(model.params) < 2:
-            return None
-        return model.params[1]  # Return the slope coefficient
-    
-    # Apply the linear regression function to each group
-    result_df = daily_min_df.group_by(["year", "week"]).agg(pl.apply(exprs=["daily_min_temp", "daily_min_cons"], function=calc_linear_relationship_minima).alias('min_temp_cons_correlation'))
-    return result_df
+def w_temp_cor_minima(df, id_col=None, week_key=False):
+    # Slope of the daily minimum consumption on the daily minimum temperature
+    return calc_temperature_correlations(df, columns=['min_temp_cons_correlation'], id_col=id_col, week_key=week_key)
 
 
-def w_temp_cor_maxima(df):
-    df = df.set_sorted('dt').group_by_dynamic('dt', every='1h', period='15m', closed='left').agg(
-        pl.col('cons').sum().alias('cons'),
-        pl.col('temp').first()
-    )
-    # Add columns for the year, week, and day
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
-    # Group by year, week, and day and calculate the daily minimum for 'cons' and 'temp'
-    daily_min_df = df.group_by(["year", "week", "weekday"]).agg([
-        pl.col('cons').max().alias('daily_max_cons'),
-        pl.col('temp').max().alias('daily_max_temp')
-    ])
+def w_temp_cor_maxima(df, id_col=None, week_key=False):
+    # Slope of the daily maximum consumption on the daily maximum temperature
+    return calc_temperature_correlations(df, columns=['max_temp_cons_correlation'], id_col=id_col, week_key=week_key)
 
-    # Group by year and week and calculate linear relationship between daily minimums
-    def calc_linear_relationship_maxima(args: List[pl.Series]):
-        if args[0].is_null().any() or args[1].is_null().any():
-            return None
-        X = sm.add_constant(args[0].to_numpy())  # Independent variable (temperature)
-        y = args[1].to_numpy()  # Dependent variable (consumption)
-        # Fit linear regression model and extract the coefficient
-        model = sm.OLS(y, X, missing='drop').fit()
-        if len(model.params) < 2:
-            return None
-        return model.params[1]  # Return the slope coefficient
-    
-    # Apply the linear regression function to each group
-    result_df = daily_min_df.group_by(["year", "week"]).agg(pl.apply(exprs=["daily_max_temp", "daily_max_cons"], function=calc_linear_relationship_maxima).alias('max_temp_cons_correlation'))
-    return result_df
 
+def w_temp_cor_maxmin(df, id_col=None, week_key=False):
+    # Slope of the daily maximum consumption on the daily minimum temperature
+    return calc_temperature_correlations(df, columns=['maxmin_temp_cons_correlation'], id_col=id_col, week_key=week_key)
 
-def w_temp_cor_maxmin(df):
-    df = df.set_sorted('dt').group_by_dynamic('dt', every='1h', period='15m', closed='left').agg(
-        pl.col('cons').sum().alias('cons'),
-        pl.col('temp').first()
-    )
-    # Add columns for the year, week, and day
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
-    # Group by year, week, and day, and calculate the daily max for power consumption and min for temperature
-    daily_values_df = df.group_by(["year", "week", "weekday"]).agg([
-        pl.col('cons').max().alias('daily_max_cons'),
-        pl.col('temp').min().alias('daily_min_temp')
-    ])
 
-    # Group by year and week and calculate linear relationship between daily minimums
-    def calc_linear_relationship_maxmin(args: List[pl.Series]):
-        if args[0].is_null().any() or args[1].is_null().any():
-            return None
-        X = sm.add_constant(args[0].to_numpy())  # Independent variable (temperature)
-        y = args[1].to_numpy()  # Dependent variable (consumption)
-        # Fit linear regression model and extract the coefficient
-        model = sm.OLS(y, X, missing='drop').fit()
-        if len(model.params) < 2:
-            return None
-        return model.params[1]  # Return the slope coefficient
-    
-    # Apply the linear regression function to each group
-    result_df = daily_values_df.group_by(["year", "week"]).agg(pl.apply(exprs=["daily_min_temp", "daily_max_cons"], function=calc_linear_relationship_maxmin).alias('maxmin_temp_cons_correlation'))
-    return result_df
+def w_temp_cor_weekday_weekend(df, id_col=None, week_key=False):
+    # Difference in consumption between weekdays and weekends over their difference in temperature
+    return calc_temperature_correlations(df, columns=['weekday_weekend_ratio'], id_col=id_col, week_key=week_key)
 
 
-def w_temp_cor_weekday_weekend(df):
-    df = df.set_sorted('dt').group_by_dynamic('dt', every='1h', period='15m', closed='left').agg(
-        pl.col('cons').sum().alias('cons'),
-        pl.col('temp').first()
-    )
-    # Add columns for the year, week, and weekday/weekend
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        (pl.col('dt').dt.weekday() < 5).alias("is_weekday")
+def _temp_cor_night(hourly, id_col, week_key):
+    # Filter for night hours (0:00 - 5:59)
+    df_night = hourly.filter((pl.col('hour') >= 0) & (pl.col('hour') < 6))
+    # Group by year and week and compute the slope of the linear relationship
+    return df_night.group_by(group_keys(id_col, week_key=week_key)).agg(linear_slope("temp", "cons").alias('temp_cons_cor_night'))
+
+
+def _temp_cor_daytime(hourly, id_col, week_key):
+    # Filter for daytime hours (6:00 - 17:59) from Monday to Friday (0-4)
+    df_daytime = hourly.filter((pl.col('hour') >= 6) & (pl.col('hour') <= 17) & (pl.col('weekday') < 5))
+    # Group by year and week and compute the slope of the linear relationship
+    return df_daytime.group_by(group_keys(id_col, week_key=week_key)).agg(linear_slope("temp", "cons").alias('temp_cons_cor_daytime'))
+
+
+def _temp_cor_evening(hourly, id_col, week_key):
+    # Filter for evening hours (18:00 - 23:59)
+    df_evening = hourly.filter((pl.col('hour') >= 18) & (pl.col('hour') <= 23))
+    # Group by year and week and compute the slope of the linear relationship
+    return df_evening.group_by(group_keys(id_col, week_key=week_key)).agg(linear_slope("temp", "cons").alias('temp_cons_cor_evening'))
+
+
+def _daily_slope(hourly, id_col, week_key, cons, temp, column):
+    # Group by year, week, and day and calculate the daily aggregates of 'cons' and 'temp'
+    daily_df = hourly.group_by(group_keys(id_col, "weekday", week_key=week_key)).agg([
+        cons(pl.col('cons')).alias('daily_cons'),
+        temp(pl.col('temp')).alias('daily_temp')
     ])
-    # Group by year, week, and is_weekday; calculate average 'cons' and 'temp'
-    avg_df = df.group_by(["year", "week", "is_weekday"]).agg([
-        pl.mean('cons').alias('avg_cons'),
-        pl.mean('temp').alias('avg_temp')
+    # Slope of the linear relationship between the daily values of each week
+    return daily_df.group_by(group_keys(id_col, week_key=week_key)).agg(linear_slope("daily_temp", "daily_cons").alias(column))
+
+
+def _temp_cor_weekday_weekend(hourly, id_col, week_key):
+    df = hourly.with_columns((pl.col('weekday') < 5).alias("is_weekday"))
+    # Group by year and week; calculate average 'cons' and 'temp' in separate
+    # columns for weekdays and weekends
+    pivot_df = df.group_by(group_keys(id_col, week_key=week_key)).agg([
+        pl.col('cons').filter(pl.col('is_weekday')).mean().alias('avg_cons_is_weekday_true'),
+        pl.col('cons').filter(~pl.col('is_weekday')).mean().alias('avg_cons_is_weekday_false'),
+        pl.col('temp').filter(pl.col('is_weekday')).mean().alias('avg_temp_is_weekday_true'),
+        pl.col('temp').filter(~pl.col('is_weekday')).mean().alias('avg_temp_is_weekday_false')
     ])
-    # Reshape the data to have separate columns for weekdays and weekends
-    pivot_df = avg_df.pivot(index=["year", "week"], columns="is_weekday", values=["avg_cons", "avg_temp"])
     # Calculate the ratio (c_wd - c_we) / (t_wd - t_we) for each week
-    ratio_df = pivot_df.with_columns([
-        ((pl.col("avg_cons_is_weekday_true") - pl.col("avg_cons_is_weekday_false")) / 
+    return pivot_df.with_columns([
+        ((pl.col("avg_cons_is_weekday_true") - pl.col("avg_cons_is_weekday_false")) /
          (pl.col("avg_temp_is_weekday_true") - pl.col("avg_temp_is_weekday_false"))).alias("weekday_weekend_ratio")
-    ]).select(['year', 'week', 'weekday_weekend_ratio'])
-    return ratio_df
-
-
-def t_above_1kw(df):
+    ]).select(group_keys(id_col, week_key=week_key) + ['weekday_weekend_ratio'])
+
+
+# weekly temperature regressions on the hourly resample, by output column
+TEMPERATURE_CORRELATIONS = {
+    'temp_cons_cor_night': _temp_cor_night,
+    'temp_cons_cor_daytime': _temp_cor_daytime,
+    'temp_cons_cor_evening': _temp_cor_evening,
+    'min_temp_cons_correlation': lambda hourly, id_col, week_key: _daily_slope(
+        hourly, id_col, week_key, pl.Expr.min, pl.Expr.min, 'min_temp_cons_correlation'),
+    'max_temp_cons_correlation': lambda hourly, id_col, week_key: _daily_slope(
+        hourly, id_col, week_key, pl.Expr.max, pl.Expr.max, 'max_temp_cons_correlation'),
+    'maxmin_temp_cons_correlation': lambda hourly, id_col, week_key: _daily_slope(
+        hourly, id_col, week_key, pl.Expr.max, pl.Expr.min, 'maxmin_temp_cons_correlation'),
+    'weekday_weekend_ratio': _temp_cor_weekday_weekend,
+}
+
+
+def calc_temperature_correlations(df, columns=list(TEMPERATURE_CORRELATIONS), id_col=None, resample=True,
+                                  week_key=False):
+    """
+    Takes a DataFrame with a datetime column 'dt', a consumption column 'cons'
+    and a temperature column 'temp', and returns the temperature regression
+    features of every week. The readings are resampled to hours once (see
+    resample_hourly) and the calendar columns of the hourly frame decoded
+    once; every feature is then computed from that frame. For a LazyFrame the
+    hourly frame is cached, so the query also resamples only once.
+
+    :param df: Polars DataFrame or LazyFrame with 'dt', 'cons' and 'temp' columns
+    :param columns: names of TEMPERATURE_CORRELATIONS to compute
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :param resample: False when df already holds the hourly readings of resample_hourly
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the requested columns per week, a week
+        being present when any of them could be computed for it
+    """
+    hourly = resample_hourly(df, id_col=id_col, week_key=week_key) if resample else df
+    hourly = with_calendar(hourly, *week_keys(week_key), 'weekday', 'hour')
+    if isinstance(hourly, pl.LazyFrame):
+        # Evaluate the resample once for all features of the query
+        hourly = hourly.cache()
+    keys = group_keys(id_col, week_key=week_key)
+    result = None
+    for col in columns:
+        frame = TEMPERATURE_CORRELATIONS[col](hourly, id_col, week_key)
+        result = frame if result is None else result.join(frame, on=keys, how='full', coalesce=True)
+    return result
+
+
+def t_above_1kw(df, id_col=None, week_key=False):
     # Add columns for the year, week, and weekday
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for weekdays
     weekday_df = df.filter(pl.col('weekday') < 5)
     # Group by year, week, day, and hour, calculate the average consumption
-    hourly_avg_df = weekday_df.filter(pl.col('cons') > 1).group_by(["year", "week", "weekday"]).agg(
+    hourly_avg_df = weekday_df.filter(pl.col('cons') > 1).group_by(group_keys(id_col, "weekday", week_key=week_key)).agg(
         pl.min('hour').alias('daily_t_above_1kW_hour')
     )
-    first_exceeding_df = hourly_avg_df.group_by(['year', 'week']).agg(
+    first_exceeding_df = hourly_avg_df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.mean('daily_t_above_1kW_hour').alias('t_above_1kw')
     )
     return first_exceeding_df
 
 
-def t_above_2kw(df):
+def t_above_2kw(df, id_col=None, week_key=False):
     # Add columns for the year, week, and weekday
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for weekdays
     weekday_df = df.filter(pl.col('weekday') < 5)
     # Group by year, week, day, and hour, calculate the average consumption
-    hourly_avg_df = weekday_df.filter(pl.col('cons') > 2).group_by(["year", "week", "weekday"]).agg(
+    hourly_avg_df = weekday_df.filter(pl.col('cons') > 2).group_by(group_keys(id_col, "weekday", week_key=week_key)).agg(
         pl.min('hour').alias('daily_t_above_1kW_hour')
     )
-    first_exceeding_df = hourly_avg_df.group_by(['year', 'week']).agg(
+    first_exceeding_df = hourly_avg_df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.mean('daily_t_above_1kW_hour').alias('t_above_2kw')
     )
     return first_exceeding_df
 
 
-def t_above_mean(df):
+def t_above_mean(df, id_col=None, week_key=False):
     # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Calculate the weekly mean for power consumption
-    weekly_mean_df = df.group_by(["year", "week"]).agg(
+    weekly_mean_df = df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.mean('cons').alias('weekly_mean_cons')
     )
     # Join the original df with the weekly means
-    joined_df = df.join(weekly_mean_df, on=["year", "week"])
+    joined_df = df.join(weekly_mean_df, on=group_keys(id_col, week_key=week_key))
     # Count the number of points above the mean per week
-    joined_df = joined_df.filter(pl.col('cons') > pl.col('weekly_mean_cons')).group_by(["year", "week", "weekday"]).agg(
+    joined_df = joined_df.filter(pl.col('cons') > pl.col('weekly_mean_cons')).group_by(group_keys(id_col, "weekday", week_key=week_key)).agg(
         pl.first('hour').alias('daily_first_time_above_mean')
     )
-    t_above_mean_df = joined_df.group_by(['year', 'week']).agg(
+    t_above_mean_df = joined_df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.mean('daily_first_time_above_mean').alias('t_above_mean')
     )
     return t_above_mean_df
 
 
-def t_daily_max(df):
+def t_daily_max(df, id_col=None, week_key=False):
     # Add columns for the year, week, and weekday
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for weekdays
     weekday_df = df.filter(pl.col('weekday') < 5)
     # Group by year, week, day, and calculate the daily maximum consumption
-    daily_max_df = weekday_df.group_by(["year", "week", "weekday"]).agg(
+    daily_max_df = weekday_df.group_by(group_keys(id_col, "weekday", week_key=week_key)).agg(
         pl.max('cons').alias('daily_max')
     )
     # Merge the daily maximum dataframe with the weekly averages
-    weekday_df = weekday_df.join(daily_max_df, on=["year", "week", "weekday"])
+    weekday_df = weekday_df.join(daily_max_df, on=group_keys(id_col, "weekday", week_key=week_key))
     # Find the first day and time when the maximum consumption reaches/exceeds the weekly average
-    daily_first_exceeding_df = weekday_df.filter(pl.col('cons') == pl.col('daily_max')).group_by(["year", "week", "weekday"]).agg(
+    daily_first_exceeding_df = weekday_df.filter(pl.col('cons') == pl.col('daily_max')).group_by(group_keys(id_col, "weekday", week_key=week_key)).agg(
         pl.first('hour').alias('daily_time_at_max')
     )
-    first_exceeding_df = daily_first_exceeding_df.group_by(['year', 'week']).agg(
+    first_exceeding_df = daily_first_exceeding_df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.mean('daily_time_at_max').alias('time_at_max')
     )
     return first_exceeding_df
 
 
-def t_daily_min(df):
+def t_daily_min(df, id_col=None, week_key=False):
     # Add columns for the year, week, and weekday
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday"),
-        pl.col('dt').dt.hour().alias("hour")
-    ])
+    df = with_calendar(df, *week_keys(week_key), 'weekday', 'hour')
     # Filter for weekdays
     weekday_df = df.filter(pl.col('weekday') < 5)
     # Group by year, week, day, and calculate the daily minimum consumption
-    daily_min_df = weekday_df.group_by(["year", "week", "weekday"]).agg(
+    daily_min_df = weekday_df.group_by(group_keys(id_col, "weekday", week_key=week_key)).agg(
         pl.min('cons').alias('daily_min')
     )
     # Merge the daily maximum dataframe with the weekly averages
-    weekday_df = weekday_df.join(daily_min_df, on=["year", "week", "weekday"])
+    weekday_df = weekday_df.join(daily_min_df, on=group_keys(id_col, "weekday", week_key=week_key))
     # Find the first day and time when the maximum consumption reaches/exceeds the weekly average
-    daily_first_exceeding_df = weekday_df.filter(pl.col('cons') == pl.col('daily_min')).group_by(["year", "week", "weekday"]).agg(
+    daily_first_exceeding_df = weekday_df.filter(pl.col('cons') == pl.col('daily_min')).group_by(group_keys(id_col, "weekday", week_key=week_key)).agg(
         pl.first('hour').alias('daily_time_at_min')
     )
-    first_exceeding_df = daily_first_exceeding_df.group_by(['year', 'week']).agg(
+    first_exceeding_df = daily_first_exceeding_df.group_by(group_keys(id_col, week_key=week_key)).agg(
         pl.mean('daily_time_at_min').alias('time_at_min')
     )
     return first_exceeding_df
 
 
-def ts_stl_varRem(df):
-    # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+# seasonal period of ts_stl_varRem, 52 readings of 15 minutes
+STL_PERIOD = timedelta(hours=13)
+
+
+def ts_stl_varRem(df, id_col=None, method='stl', n_workers=None, week_key=False):
+    """
+    Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
+    and returns the variance of the remainder of the seasonal decomposition
+    (period STL_PERIOD) of every week, or null for weeks with missing readings.
+
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :param method: 'stl' for statsmodels' STL, or the faster approximations
+        'stl_fast' and 'moving_average' (see kernels.stl_remainder_variance)
+    :param n_workers: number of processes the weeks are spread over, None to
+        decompose them in this process
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the remainder variance per week
+    """
+    # Add columns for the year and week, and the sampling interval of every meter
+    df = with_resolution(with_calendar(df, *week_keys(week_key)), id_col=id_col)
     # Sort by 'dt'
     df = df.sort('dt')
-    # Group by year and week, and check for missing values in each group
-    # missing_check_df = df.group_by(["year", "week"]).agg(
-    #     pl.any(pl.col('cons').is_null()).alias('has_missing')
-    # )
-    # # Join the original df with the missing values check
-    # df = df.join(missing_check_df, on=["year", "week"])
-
-    # Apply STL decomposition and calculate variance, but output NaN if missing values are present
-    def calc_stl_variance(args: List[pl.Series]):
-        if args[0].is_null().any():
-            return None
-        ts_data = args[0].to_numpy()
-        stl = STL(ts_data, period=52)  # Adjust period as needed
-        result = stl.fit()
-        remainder = result.resid
-        return np.var(remainder)
-
-    result_df = df.group_by(["year", "week"]).agg(pl.apply([pl.col('cons')],calc_stl_variance).alias("ts_stl_varRem"))
-    # if the column is list[i64], we use expr.list.first() to get the first element of the list
-    if result_df['mean_residual_stl'].dtype == pl.List:
-        result_df = result_df.with_columns(pl.col("ts_stl_varRem").list.first())
-    else:
-        pass
-    return result_df
+    weeks = df.group_by(group_keys(id_col, week_key=week_key)).agg(
+        pl.col('cons').cast(pl.Float64).alias('cons'),
+        pl.col('cons').null_count().alias('n_missing'),
+        pl.col('resolution').first().alias('resolution')
+    )
 
+    keys = group_keys(id_col, week_key=week_key)
 
-def ts_acf_mean3h(df):
-    # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    # Decompose all complete weeks at once, output null if missing values are present
+    def remainder_variance(weeks):
+        values, starts, lengths = _week_series(weeks['cons'])
+        complete = weeks['n_missing'].to_numpy() == 0
+        periods = readings(STL_PERIOD, weeks['resolution'].to_numpy())
+        variances = np.full(len(weeks), np.nan)
+        # One batch per sampling interval of the meters
+        for period in np.unique(periods[complete]):
+            rows = complete & (periods == period)
+            variances[rows] = stl_remainder_variance(values, starts[rows], lengths[rows], period=int(period),
+                                                     method=method, n_workers=n_workers)
+        return weeks.select(keys).with_columns(
+            pl.when(weeks['n_missing'] == 0).then(pl.Series('ts_stl_varRem', variances)).alias('ts_stl_varRem')
+        )
 
-    lags = calculate_lags_for_3h(df)
-
-    # Function to apply to each group
-    def calc_autocorrelation(args: List[pl.Series]):
-        # Check for missing values
-        if args[0].is_null().any():
-            return None
-        # Calculate autocorrelation with lag up to 12
-        autocorr_values = acf(args[0].to_numpy(), nlags=lags, fft=True, missing='conservative')
-        # Compute the mean of the autocorrelation values (excluding the first value at lag=0)
-        mean_autocorr = np.mean(autocorr_values[1:])
-        return mean_autocorr
-
-    # Group by year and week and apply the autocorrelation function
-    result_df = df.group_by(["year", "week"]).agg(pl.apply([pl.col('cons')],calc_autocorrelation).alias("ts_acf_mean3h"))
-    # if the column is list[i64], we use expr.list.first() to get the first element of the list
-    if result_df['ts_acf_mean3h'].dtype == pl.List:
-        result_df = result_df.with_columns(pl.col("ts_acf_mean3h").list.first())
-    else:
-        pass
-    return result_df
+    return _map_weeks(weeks, remainder_variance, {'ts_stl_varRem': pl.Float64}, id_col=id_col, week_key=week_key)
 
 
-def ts_acf_mean3h_weekday(df):
-    # Add columns for the year, week, and weekday
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week"),
-        pl.col('dt').dt.weekday().alias("weekday")
-    ])
+def ts_acf_mean3h(df, id_col=None, week_key=False):
+    # Add columns for the year and week
+    df = with_calendar(df, *week_keys(week_key))
+    # Mean autocorrelation of each week up to a lag of 3 hours
+    return calc_acf_mean(df, 'ts_acf_mean3h', id_col=id_col, week_key=week_key)
+
+
+def ts_acf_mean3h_weekday(df, id_col=None, week_key=False):
+    # Add columns for the year, week, and weekday, and the sampling interval of
+    # every meter before the weekends are removed
+    df = with_resolution(with_calendar(df, *week_keys(week_key), 'weekday'), id_col=id_col)
     # Filter for weekdays
     weekday_df = df.filter(pl.col('weekday') < 5)
+    # Mean autocorrelation of the weekdays of each week up to a lag of 3 hours
+    return calc_acf_mean(weekday_df, 'acf_mean3h_weekday', id_col=id_col, week_key=week_key)
 
-    lags = calculate_lags_for_3h(weekday_df)
-
-    # Function to apply to each group
-    def calc_autocorrelation(args: List[pl.Series]):
-        # Check for missing values
-        if args[0].is_null().any():
-            return None
-        # Calculate autocorrelation with lag up to 12
-        autocorr_values = acf(args[0].to_numpy(), nlags=lags, fft=True, missing='conservative')
-        # Compute the mean of the autocorrelation values (excluding the first value at lag=0)
-        mean_autocorr = np.mean(autocorr_values[1:])
-        return mean_autocorr
-
-    # Group by year and week and apply the autocorrelation function
-    result_df = weekday_df.group_by(["year", "week"]).agg(pl.apply([pl.col('cons')],calc_autocorrelation).alias("acf_mean3h_weekday"))
-    if result_df['acf_mean3h_weekday'].dtype == pl.List:
-        result_df = result_df.with_columns(pl.col("acf_mean3h_weekday").list.first())
-    else:
-        pass
-    return result_df
 
+# highest lag of the autocorrelation features
+ACF_MAX_LAG = timedelta(hours=3)
 
-def t_wide_peaks(df):
-    # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
 
-    # Function to calculate peak metrics for each group
-    def number_wide_peaks(args: List[pl.Series]):
-        if args[0].is_null().any():
-            return None
-        # Identify peaks
-        max_val = args[0].max()
-        peaks = args[0] > (0.5 * max_val)
-        # Find non-peaks and calculate peak widths
-        non_peaks = [i for i, val in enumerate(peaks, start=1) if not val]
-        non_peaks.append(len(peaks) + 1)  # Append a sentinel value
-        lv = 0
-        d_peaks = [2]  # Initialize with 2 as in the R code
-        for i in non_peaks:
-            temp = sum(peaks[lv:i])
-            if temp > 1:
-                d_peaks.append(temp)
-            lv = i
-        # Calculate metrics
-        N_peaks = sum(d_peaks)
-        #mean_d_peaks = np.mean(d_peaks)
-        return N_peaks
-
-    # Group by year and week and apply the autocorrelation function
-    result_df = df.group_by(["year", "week"]).agg(pl.apply(pl.col('cons'),number_wide_peaks).alias("t_wide_peaks"))
-    # if the column is list[i64], we use expr.list.first() to get the first element of the list
-    if result_df['t_wide_peaks'].dtype == pl.List:
-        result_df = result_df.with_columns(pl.col("t_wide_peaks").list.first())
-    else:
-        pass
-    return result_df
+def calc_acf_mean(df, alias, id_col=None, week_key=False):
+    """
+    Takes a DataFrame with year, week, datetime 'dt' and consumption 'cons'
+    columns, and returns the mean autocorrelation over the lags up to
+    ACF_MAX_LAG of every week, or null for weeks with missing readings. The autocorrelation
+    of all weeks is computed at once with a batched FFT (see kernels.acf_mean).
 
+    :param df: Polars DataFrame or LazyFrame with 'year', 'week', 'dt' and 'cons' columns
+    :param alias: name of the output column
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the mean autocorrelation per week
+    """
+    df = with_resolution(df, id_col=id_col)
+    weeks = df.group_by(group_keys(id_col, week_key=week_key)).agg(
+        pl.col('cons').cast(pl.Float64).alias('cons'),
+        pl.col('cons').null_count().alias('n_missing'),
+        pl.col('resolution').first().alias('resolution')
+    )
 
-def t_width_peaks(df):
-    # Add columns for the year and week
-    df = df.with_columns([
-        pl.col('dt').dt.year().alias("year"),
-        pl.col('dt').dt.week().alias("week")
-    ])
+    keys = group_keys(id_col, week_key=week_key)
 
-    # Function to calculate peak metrics for each group
-    def width_peaks(args: List[pl.Series]):
-        if args[0].is_null().any():
-            return None
-        # Identify peaks
-        max_val = args[0].max()
-        peaks = args[0] > (0.5 * max_val)
-        # Find non-peaks and calculate peak widths
-        non_peaks = [i for i, val in enumerate(peaks, start=1) if not val]
-        non_peaks.append(len(peaks) + 1)  # Append a sentinel value
-        lv = 0
-        d_peaks = [2]  # Initialize with 2 as in the R code
-        for i in non_peaks:
-            temp = sum(peaks[lv:i])
-            if temp > 1:
-                d_peaks.append(temp)
-            lv = i
-        # Calculate metrics
-        mean_d_peaks = np.mean(d_peaks)
-        return mean_d_peaks
-
-    # Group by year and week and apply the autocorrelation function
-    result_df = df.group_by(["year", "week"]).agg(pl.apply(pl.col('cons'),width_peaks).alias("t_width_peaks"))
-    # if the column is list[i64], we use expr.list.first() to get the first element of the list
-    if result_df['t_width_peaks'].dtype == pl.List:
-        result_df = result_df.with_columns(pl.col("t_width_peaks").list.first())
-    else:
-        pass
-    return result_df
\ No newline at end of file
+    def autocorrelation(weeks):
+        values, starts, lengths = _week_series(weeks['cons'])
+        complete = weeks['n_missing'].to_numpy() == 0
+        lags = readings(ACF_MAX_LAG, weeks['resolution'].to_numpy())
+        means = np.full(len(weeks), np.nan)
+        # One batch per sampling interval of the meters
+        for nlags in np.unique(lags[complete]):
+            rows = complete & (lags == nlags)
+            means[rows] = acf_mean(values, starts[rows], lengths[rows], int(nlags))
+        return weeks.select(keys).with_columns(
+            pl.when(weeks['n_missing'] == 0).then(pl.Series(alias, means)).alias(alias)
+        )
+
+    return _map_weeks(weeks, autocorrelation, {alias: pl.Float64}, id_col=id_col, week_key=week_key)
+
+
+def _week_series(cons):
+    # Values of a list column back to back, with the start and length of every row
+    lengths = cons.list.len().to_numpy().astype(np.intp)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.intp)
+    values = cons.explode().to_numpy()
+    return values, starts, lengths
+
+
+# Python callbacks run by _map_weeks and the weeks they processed, read by the
+# profiling of calc_features_consumption
+UDF_CALLS = Counter()
+
+
+def _map_weeks(weeks, function, dtypes, id_col=None, week_key=False):
+    # Apply a function computing weekly features from a frame with one row per
+    # week to a DataFrame, or lazily to a LazyFrame; the function may run on
+    # collect, so it must not read the week keys itself
+    def counted(weeks):
+        UDF_CALLS['calls'] += 1
+        UDF_CALLS['weeks'] += weeks.height
+        return function(weeks)
+
+    if isinstance(weeks, pl.LazyFrame):
+        schema = {key: dtype for key, dtype in weeks.schema.items() if key in group_keys(id_col, week_key=week_key)}
+        schema.update(dtypes)
+        # The output columns differ from the input ones, so nothing may be pushed through
+        return weeks.map_batches(counted, schema=schema, predicate_pushdown=False,
+                                 projection_pushdown=False, slice_pushdown=False)
+    return counted(weeks)
+
+
+def t_wide_peaks(df, id_col=None, week_key=False):
+    # Total width of the runs above half the weekly maximum
+    return calc_wide_peaks(df, columns=['t_wide_peaks'], id_col=id_col, week_key=week_key)
+
+
+def t_width_peaks(df, id_col=None, week_key=False):
+    # Mean width of the runs above half the weekly maximum
+    return calc_wide_peaks(df, columns=['t_width_peaks'], id_col=id_col, week_key=week_key)
+
+
+def calc_wide_peaks(df, columns=['t_wide_peaks', 't_width_peaks'], id_col=None, week_key=False):
+    """
+    Takes a DataFrame with a datetime column 'dt' and a consumption column 'cons',
+    and returns the wide peak features of every week: the runs of readings above
+    half the weekly maximum are found for all weeks in one pass (see
+    kernels.wide_peaks), so t_wide_peaks and t_width_peaks can share the work.
+
+    :param df: Polars DataFrame or LazyFrame with 'dt' and 'cons' columns
+    :param columns: 't_wide_peaks' and/or 't_width_peaks'
+    :param id_col: optional meter identifier column, features are then computed per meter
+    :param week_key: key the weeks by the packed 'week_key' instead of 'year' and 'week', see utilities.week_keys
+    :return: Polars DataFrame (LazyFrame for LazyFrame input) with the requested columns per week, null for
+        weeks with missing readings
+    """
+    # Add columns for the year and week
+    df = with_calendar(df, *week_keys(week_key))
+    weeks = df.group_by(group_keys(id_col, week_key=week_key)).agg(
+        pl.col('cons').cast(pl.Float64).alias('cons'),
+        (0.5 * pl.col('cons').max()).cast(pl.Float64).alias('threshold'),
+        pl.col('cons').null_count().alias('n_missing')
+    )
+
+    keys = group_keys(id_col, week_key=week_key)
+
+    def peaks(weeks):
+        values, starts, lengths = _week_series(weeks['cons'])
+        complete = weeks['n_missing'].to_numpy() == 0
+        total_width = np.zeros(len(weeks), dtype=np.int64)
+        mean_width = np.zeros(len(weeks))
+        total_width[complete], mean_width[complete] = wide_peaks(
+            values, starts[complete], lengths[complete], weeks['threshold'].to_numpy()[complete])
+        features = {'t_wide_peaks': total_width, 't_width_peaks': mean_width}
+        return weeks.select(keys).with_columns([
+            pl.when(weeks['n_missing'] == 0).then(pl.Series(col, features[col])).alias(col)
+            for col in columns
+        ])
+
+    dtypes = {'t_wide_peaks': pl.Int64, 't_width_peaks': pl.Float64}
+    return _map_weeks(weeks, peaks, {col: dtypes[col] for col in columns}, id_col=id_col, week_key=week_key)
@@ -0,0 +1,100 @@
+import io
+import os
+import numpy as np
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+
+def _run_shared(name, shape, dtype, function, args):
+    # Worker side of map_shared: attach to the shared block and run one task on it
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        values = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        result = function(values, *args)
+        # The view must be released before the block can be closed
+        del values
+        return result
+    finally:
+        block.close()
+
+
+def map_shared(function, values, tasks, n_workers):
+    """
+    Runs function(values, *args) for every args in tasks on a pool of
+    n_workers processes. The values array is copied once into shared memory
+    and every worker reads it from there, so only the small task arguments
+    are pickled. Workers are spawned rather than forked, since forking a
+    process that runs Polars' thread pool is not safe; scripts calling this
+    must therefore guard their entry point with if __name__ == '__main__'.
+
+    :param function: module level function taking the values array first, it
+        must not return views of it
+    :param values: NumPy array shared with the workers
+    :param tasks: list of argument tuples, one per task
+    :param n_workers: number of worker processes
+    :return: list with the result of every task, in the order of tasks
+    """
+    values = np.ascontiguousarray(values)
+    block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        shared = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+        shared[:] = values
+        del shared
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as pool:
+            futures = [pool.submit(_run_shared, block.name, values.shape, values.dtype.str, function, args)
+                       for args in tasks]
+            return [future.result() for future in futures]
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _limit_threads(n_threads):
+    # Worker initializer: share the cores between the workers instead of giving
+    # each worker's Polars thread pool all of them. The worker has imported
+    # Polars by now, but Polars only reads this setting when its thread pool
+    # starts, on the first query, and no task has run yet. Setting it here
+    # keeps it out of the environment of this process and its other children
+    os.environ.setdefault('POLARS_MAX_THREADS', str(n_threads))
+
+
+def _run_ipc(function, data, args):
+    # Worker side of map_frames: frames travel as Arrow IPC buffers both ways
+    import polars as pl
+    result = function(pl.read_ipc(io.BytesIO(data)), *args)
+    buffer = io.BytesIO()
+    result.write_ipc(buffer)
+    return buffer.getvalue()
+
+
+def map_frames(function, frames, n_workers, args=()):
+    """
+    Runs function(frame, *args) for every Polars DataFrame in frames on a pool
+    of n_workers processes. Frames and results are passed as Arrow IPC
+    buffers, which are serialized column by column rather than pickled row by
+    row. Like map_shared, the workers are spawned and scripts calling this
+    must guard their entry point with if __name__ == '__main__'. Each worker
+    limits its Polars thread pool to its share of the cores through
+    POLARS_MAX_THREADS, unless that is already set; the environment of the
+    calling process is left as it is.
+
+    :param function: module level function taking a DataFrame first and returning a DataFrame
+    :param frames: list of Polars DataFrames, one per task
+    :param n_workers: number of worker processes
+    :param args: further arguments passed to every call
+    :return: list with the resulting DataFrames, in the order of frames
+    """
+    import polars as pl
+    payloads = []
+    for frame in frames:
+        buffer = io.BytesIO()
+        frame.write_ipc(buffer)
+        payloads.append(buffer.getvalue())
+    context = multiprocessing.get_context('spawn')
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                             initializer=_limit_threads, initargs=(n_threads,)) as pool:
+        futures = [pool.submit(_run_ipc, function, payload, args) for payload in payloads]
+        return [pl.read_ipc(io.BytesIO(future.result())) for future in futures]
@@ -0,0 +1,233 @@
+import polars as pl
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# hour sets of the dayparts used throughout module.py
+MORNING = (6, 7, 8, 9)
+NOON = (10, 11, 12, 13)
+AFTERNOON = (14, 15, 16, 17)
+EVENING = (18, 19, 20, 21)
+NIGHT = (1, 2, 3, 4, 5)
+
+# weekday values kept by the row filters of module.py; the features compare
+# against polars' weekday numbers as they are, so these mirror the code
+WEEKDAYS = (0, 1, 2, 3, 4)
+WEEKEND = (5, 6)
+WEEKEND_FROM_5 = (5, 6, 7)
+
+# stages a feature can be computed in
+AGG = 'agg'            # one weekly aggregation over the raw rows
+DERIVED = 'derived'    # an expression over the columns of other features
+FUNCTION = 'function'  # needs its own pass, computed by the function in module.py
+
+
+@dataclass(frozen=True)
+class Feature:
+    """
+    Description of a weekly feature listed in smap.__all__.
+
+    :param name: name of the feature function in module.py
+    :param column: name of the column the feature is returned in
+    :param stage: AGG, DERIVED or FUNCTION
+    :param expr: factory of the polars expression computing the feature, None
+        for FUNCTION features; AGG expressions are evaluated inside the weekly
+        group_by, DERIVED expressions on the frame of their dependencies
+    :param dtype: dtype of the output column for Float64 consumption input
+    :param days: weekday values the rows are restricted to, None for all days
+    :param hours: hours the rows are restricted to, None for all hours
+    :param udf: whether the feature calls a Python function for every week
+    :param depends_on: names of the features whose columns the feature is
+        derived from
+    :param inputs: columns of the input frame the feature reads besides 'dt'
+    """
+    name: str
+    column: str
+    stage: str
+    expr: Optional[Callable[[], pl.Expr]] = None
+    dtype: pl.PolarsDataType = pl.Float64
+    days: Optional[Tuple[int, ...]] = None
+    hours: Optional[Tuple[int, ...]] = None
+    udf: bool = False
+    depends_on: Tuple[str, ...] = ()
+    inputs: Tuple[str, ...] = ('cons',)
+
+    def row_filter(self):
+        # Expression selecting the rows the feature is computed on, None for all rows
+        conditions = []
+        if self.days is not None:
+            conditions.append(pl.col('weekday').is_in(list(self.days)))
+        if self.hours is not None:
+            conditions.append(pl.col('hour').is_in(list(self.hours)))
+        if not conditions:
+            return None
+        condition = conditions[0]
+        for other in conditions[1:]:
+            condition = condition & other
+        return condition
+
+
+def _agg(name, column, stat, days=None, hours=None, dtype=pl.Float64):
+    # Feature aggregating the consumption of the filtered rows of each week
+    def expr():
+        cons = pl.col('cons')
+        condition = feature.row_filter()
+        if condition is not None:
+            cons = cons.filter(condition)
+        return stat(cons).alias(column)
+    feature = Feature(name, column, AGG, expr, dtype=dtype, days=days, hours=hours)
+    return feature
+
+
+def _derived(name, column, depends_on, combine, fill_null=False):
+    # Feature combining the columns of two other features; with fill_null the
+    # missing values are replaced by 0 first, as the r_* functions do after their join
+    def expr():
+        left, right = (pl.col(FEATURES[dep].column) for dep in depends_on)
+        if fill_null:
+            left, right = left.fill_null(0), right.fill_null(0)
+        return combine(left, right).alias(column)
+    return Feature(name, column, DERIVED, expr, depends_on=tuple(depends_on))
+
+
+def _function(name, column, dtype=pl.Float64, days=None, hours=None, udf=False, inputs=('cons',)):
+    # Feature computed by its own function in module.py
+    return Feature(name, column, FUNCTION, dtype=dtype, days=days, hours=hours, udf=udf, inputs=inputs)
+
+
+def _difference(left, right):
+    return left - right
+
+
+def _ratio(left, right):
+    return left / right
+
+
+_FEATURES = [
+    _agg('c_week', 'average_cons', pl.Expr.mean),
+    _agg('s_max', 'max_cons', pl.Expr.max),
+    _agg('s_min', 'min_cons', pl.Expr.min),
+    _agg('c_morning', 'average_cons_morning', pl.Expr.mean, hours=MORNING),
+    _agg('c_noon', 'average_cons_noon', pl.Expr.mean, hours=NOON),
+    _agg('c_afternoon', 'average_cons_afternoon', pl.Expr.mean, hours=AFTERNOON),
+    _agg('c_evening', 'average_cons_evening', pl.Expr.mean, hours=EVENING),
+    _agg('c_night', 'average_cons_night', pl.Expr.mean, hours=NIGHT),
+    _agg('c_weekday', 'average_cons_wd', pl.Expr.mean, days=WEEKDAYS),
+    _agg('c_var_weekday', 'var_cons_wd', pl.Expr.var, days=WEEKDAYS),
+    _agg('s_wd_min', 'min_cons_wd', pl.Expr.min, days=WEEKDAYS),
+    _agg('s_wd_max', 'max_cons_wd', pl.Expr.max, days=WEEKDAYS),
+    _agg('c_wd_morning', 'average_cons_wd_morning', pl.Expr.mean, days=WEEKDAYS, hours=MORNING),
+    _agg('c_wd_noon', 'average_cons_wd_noon', pl.Expr.mean, days=WEEKDAYS, hours=NOON),
+    _agg('c_wd_afternoon', 'average_cons_wd_afternoon', pl.Expr.mean, days=WEEKDAYS, hours=AFTERNOON),
+    _agg('c_wd_evening', 'average_cons_wd_evening', pl.Expr.mean, days=WEEKDAYS, hours=EVENING),
+    _agg('c_wd_night', 'average_cons_wd_night', pl.Expr.mean, days=WEEKDAYS, hours=NIGHT),
+    _agg('c_weekend', 'average_cons_weekend', pl.Expr.mean, days=WEEKEND),
+    _agg('c_var_weekend', 'var_cons_weekend', pl.Expr.var, days=WEEKEND),
+    _agg('s_we_min', 'min_cons_weekend', pl.Expr.min, days=WEEKEND),
+    _agg('s_we_max', 'max_cons_weekend', pl.Expr.max, days=WEEKEND),
+    _agg('c_we_morning', 'average_cons_we_morning', pl.Expr.mean, days=WEEKEND, hours=MORNING),
+    _agg('c_we_noon', 'average_cons_we_noon', pl.Expr.mean, days=WEEKEND, hours=NOON),
+    _agg('c_we_afternoon', 'average_cons_we_afternoon', pl.Expr.mean, days=WEEKEND, hours=AFTERNOON),
+    _agg('c_we_evening', 'average_cons_we_evening', pl.Expr.mean, days=WEEKEND, hours=EVENING),
+    _agg('c_we_night', 'average_cons_we_night', pl.Expr.mean, days=WEEKEND, hours=NIGHT),
+    _derived('c_week_no_min', 'cons_week_no_min', ['c_week', 's_min'], _difference),
+    _derived('s_max_no_min', 'cons_max_no_min', ['s_max', 's_min'], _difference),
+    _derived('c_evening_no_min', 'cons_evening_no_min', ['c_evening', 's_min'], _difference),
+    _derived('c_morning_no_min', 'cons_morning_no_min', ['c_morning', 's_min'], _difference),
+    _derived('c_noon_no_min', 'cons_noon_no_min', ['c_noon', 's_min'], _difference),
+    _derived('c_night_no_min', 'cons_night_no_min', ['c_night', 's_min'], _difference),
+    _derived('r_mean_max', 'ratio_mean_max', ['c_week', 's_max'], _ratio),
+    _derived('r_min_mean', 'ratio_min_mean', ['s_min', 'c_week'], _ratio),
+    _derived('r_night_mean', 'ratio_night_mean', ['c_night', 'c_week'], _ratio, fill_null=True),
+    _derived('r_morning_noon', 'ratio_morning_noon', ['c_morning', 'c_noon'], _ratio, fill_null=True),
+    _derived('r_evening_noon', 'ratio_evening_noon', ['c_evening', 'c_noon'], _ratio, fill_null=True),
+    _derived('r_mean_max_no_min', 'ratio_mean_max_no_min', ['c_week_no_min', 's_max_no_min'], _ratio),
+    _derived('r_evening_noon_no_min', 'ratio_evening_noon_no_min', ['c_evening_no_min', 'c_noon_no_min'], _ratio, fill_null=True),
+    _derived('r_morning_noon_no_min', 'ratio_morning_noon_no_min', ['c_morning_no_min', 'c_noon_no_min'], _ratio, fill_null=True),
+    _derived('r_day_night_no_min', 'ratio_day_night_no_min', ['c_week_no_min', 'c_night_no_min'], _ratio, fill_null=True),
+    _derived('r_var_wd_we', 'ratio_var_wd_we', ['c_var_weekday', 'c_var_weekend'], _ratio),
+    _derived('r_min_wd_we', 'ratio_min_wd_we', ['s_wd_min', 's_we_min'], _ratio),
+    _derived('r_max_wd_we', 'ratio_max_wd_we', ['s_wd_max', 's_we_max'], _ratio),
+    _derived('r_evening_wd_we', 'ratio_evening_wd_we', ['c_wd_evening', 'c_we_evening'], _ratio),
+    _derived('r_night_wd_we', 'ratio_night_wd_we', ['c_wd_night', 'c_we_night'], _ratio),
+    _derived('r_noon_wd_we', 'ratio_noon_wd_we', ['c_wd_noon', 'c_we_noon'], _ratio),
+    _derived('r_morning_wd_we', 'ratio_morning_wd_we', ['c_wd_morning', 'c_we_morning'], _ratio),
+    _derived('r_afternoon_wd_we', 'ratio_afternoon_wd_we', ['c_wd_afternoon', 'c_we_afternoon'], _ratio),
+    _derived('r_we_night_day', 'ratio_we_night_day', ['c_we_night', 'c_weekend'], _ratio),
+    _derived('r_we_morning_noon', 'ratio_we_morning_noon', ['c_we_morning', 'c_we_noon'], _ratio),
+    _derived('r_we_evening_noon', 'ratio_we_evening_noon', ['c_we_evening', 'c_we_noon'], _ratio),
+    _derived('r_wd_night_day', 'ratio_wd_night_day', ['c_wd_night', 'c_wd_noon'], _ratio),
+    _derived('r_wd_morning_noon', 'ratio_wd_morning_noon', ['c_wd_morning', 'c_wd_noon'], _ratio),
+    _derived('r_wd_evening_noon', 'ratio_wd_evening_noon', ['c_wd_evening', 'c_wd_noon'], _ratio),
+    _agg('s_sm_variety', 's_sm_variety', lambda cons: cons.diff().abs().quantile(0.20)),
+    _agg('s_bg_variety', 's_bg_variety', lambda cons: cons.diff().abs().quantile(0.60)),
+    _agg('s_day_diff', 'weekday_diff', lambda cons: cons.diff().abs().mean(), days=WEEKDAYS),
+    _agg('s_variance', 'cons_variance', pl.Expr.var),
+    _agg('s_var_wd', 'cons_varianc_wd', pl.Expr.var, days=WEEKDAYS),
+    _agg('s_var_we', 'cons_variance_we', pl.Expr.var, days=WEEKEND_FROM_5),
+    _agg('s_diff', 'total_abs_diff', lambda cons: cons.diff().abs().sum()),
+    _function('s_cor', 'mean_cor'),
+    _function('s_num_peaks', 'num_peaks', dtype=pl.Int64),
+    _agg('s_q1', 'lower_quartile', lambda cons: cons.quantile(0.25)),
+    _agg('s_q2', 'median', lambda cons: cons.quantile(0.5)),
+    _agg('s_q3', 'upper_quartile', lambda cons: cons.quantile(0.75)),
+    _function('c_max_avg', 'weekly_avg_max'),
+    _function('c_min_avg', 'weekly_avg_min'),
+    _agg('s_number_zeros', 's_number_zeros', lambda cons: (cons == 0).sum(), dtype=pl.UInt32),
+    _function('s_cor_wd', 'mean_cor_wd'),
+    _function('s_cor_we', 'mean_cor_we'),
+    _function('s_cor_wd_we', 's_cor_wd_we'),
+    _function('s_number_small_peaks', 'num_small_peaks', dtype=pl.Int64),
+    _function('s_number_big_peaks', 'num_big_peaks', dtype=pl.Int64),
+    Feature('w_temp_cor_overall', 'temp_cons_cor', AGG,
+            lambda: pl.corr('temp', 'cons').alias('temp_cons_cor'), inputs=('cons', 'temp')),
+    _function('w_temp_cor_night', 'temp_cons_cor_night', hours=(0, 1, 2, 3, 4, 5),
+              inputs=('cons', 'temp')),
+    _function('w_temp_cor_daytime', 'temp_cons_cor_daytime', days=WEEKDAYS, hours=tuple(range(6, 18)),
+              inputs=('cons', 'temp')),
+    _function('w_temp_cor_evening', 'temp_cons_cor_evening', hours=tuple(range(18, 24)),
+              inputs=('cons', 'temp')),
+    _function('w_temp_cor_minima', 'min_temp_cons_correlation', inputs=('cons', 'temp')),
+    _function('w_temp_cor_maxima', 'max_temp_cons_correlation', inputs=('cons', 'temp')),
+    _function('w_temp_cor_maxmin', 'maxmin_temp_cons_correlation', inputs=('cons', 'temp')),
+    _function('w_temp_cor_weekday_weekend', 'weekday_weekend_ratio', inputs=('cons', 'temp')),
+    _function('t_above_1kw', 't_above_1kw', days=WEEKDAYS),
+    _function('t_above_2kw', 't_above_2kw', days=WEEKDAYS),
+    _function('t_above_mean', 't_above_mean'),
+    _function('t_daily_max', 'time_at_max', days=WEEKDAYS),
+    _function('t_daily_min', 'time_at_min', days=WEEKDAYS),
+    _function('ts_stl_varRem', 'ts_stl_varRem', udf=True),
+    _function('ts_acf_mean3h', 'ts_acf_mean3h'),
+    _function('ts_acf_mean3h_weekday', 'acf_mean3h_weekday', days=WEEKDAYS),
+    _function('t_wide_peaks', 't_wide_peaks', dtype=pl.Int64),
+    _function('t_width_peaks', 't_width_peaks'),
+]
+
+# every feature of smap.__all__ by name, in the same order
+FEATURES: Dict[str, Feature] = {feature.name: feature for feature in _FEATURES}
+
+
+def resolve(names) -> List[Feature]:
+    """
+    Returns the requested features together with all features they depend on,
+    each one once and every feature after its dependencies.
+
+    :param names: names of the requested features
+    :return: list of Feature
+    """
+    unknown = [name for name in names if name not in FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown features: {unknown}")
+    resolved = {}
+
+    def visit(name):
+        if name in resolved:
+            return
+        feature = FEATURES[name]
+        for dep in feature.depends_on:
+            visit(dep)
+        resolved[name] = feature
+
+    for name in names:
+        visit(name)
+    return list(resolved.values())
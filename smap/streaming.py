@@ -0,0 +1,81 @@
+import polars as pl
+from datetime import timedelta
+from .engine import FUSED_FEATURES, calc_features_fused
+
+
+# function inputs a stream of readings, outputs the features of every week once it is complete
+def stream_features(records, features=None, id_col='meter_id'):
+    """
+    Computes weekly features from readings as they arrive. The readings of
+    the open week of every meter are kept until a reading of a later week of
+    that meter arrives; the week is then closed and its feature row emitted,
+    computed by calc_features_fused exactly as for a DataFrame of that week.
+    The state is bounded by one week of readings per meter. Readings of a
+    week that was already closed are dropped, and the weeks still open when
+    the stream ends are emitted last.
+
+    Weeks run from Monday to Sunday. Unlike calc_features_consumption, the
+    days of a week around new year are never merged with another week that
+    happens to get the same (year, week) key.
+
+    :param records: iterable of (meter_id, dt, cons, temp) tuples, temp may be None
+    :param features: names of the AGG or DERIVED features of the registry to
+        compute; defaults to FUSED_FEATURES
+    :param id_col: name of the meter identifier in the emitted rows
+    :return: generator of dicts with the meter identifier, 'year', 'week' and
+        one entry per feature column
+    """
+    open_weeks = {}
+    for record in records:
+        yield from _push(open_weeks, record, features, id_col)
+    yield from _flush(open_weeks, features, id_col)
+
+
+async def astream_features(records, features=None, id_col='meter_id'):
+    """
+    Asyncio version of stream_features.
+
+    :param records: async iterable of (meter_id, dt, cons, temp) tuples
+    :param features: names of the AGG or DERIVED features of the registry to compute
+    :param id_col: name of the meter identifier in the emitted rows
+    :return: async generator of dicts, as stream_features
+    """
+    open_weeks = {}
+    async for record in records:
+        for row in _push(open_weeks, record, features, id_col):
+            yield row
+    for row in _flush(open_weeks, features, id_col):
+        yield row
+
+
+def _push(open_weeks, record, features, id_col):
+    # Add a reading to the open week of its meter, closing that week first when the reading starts a new one
+    meter, dt, cons, temp = record
+    week_start = dt.date() - timedelta(days=dt.weekday())
+    current = open_weeks.get(meter)
+    if current is not None and week_start < current[0]:
+        return []
+    rows = []
+    if current is not None and week_start > current[0]:
+        rows = _close(meter, current[1], features, id_col)
+        current = None
+    if current is None:
+        current = open_weeks[meter] = (week_start, [])
+    current[1].append((dt, cons, temp))
+    return rows
+
+
+def _flush(open_weeks, features, id_col):
+    # Close the weeks of all meters
+    rows = []
+    for meter, (_, readings) in open_weeks.items():
+        rows.extend(_close(meter, readings, features, id_col))
+    open_weeks.clear()
+    return rows
+
+
+def _close(meter, readings, features, id_col):
+    # Feature rows of the readings of one week of a meter
+    df = pl.DataFrame(readings, schema={'dt': pl.Datetime, 'cons': pl.Float64, 'temp': pl.Float64}, orient='row')
+    df = df.with_columns(pl.lit(meter).alias(id_col))
+    return calc_features_fused(df, features if features is not None else FUSED_FEATURES, id_col=id_col).rows(named=True)
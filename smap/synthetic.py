@@ -0,0 +1,67 @@
+"""
+Synthetic smart meter readings for tests and benchmarks.
+
+The load of every meter is a base load plus morning and evening peaks that
+move later on weekends, electric heating that follows the outside
+temperature, gamma distributed noise and occasional zero readings. The
+temperature combines a yearly and a daily cycle with weather that drifts
+over a few days.
+"""
+import numpy as np
+import polars as pl
+from datetime import datetime
+
+
+# readings per hour of the supported resolutions
+RESOLUTIONS = {'15m': 4, '30m': 2, '1h': 1}
+
+
+def synthetic_readings(n_meters=10, n_weeks=4, resolution='15m', start=datetime(2023, 1, 2), seed=0):
+    """
+    Generates load and temperature series for a number of meters.
+
+    :param n_meters: number of meters
+    :param n_weeks: number of weeks of readings per meter, starting on a Monday
+    :param resolution: '15m', '30m' or '1h'
+    :param start: first timestamp
+    :param seed: seed of the random generator
+    :return: Polars DataFrame with the columns 'meter_id', 'dt', 'cons' and 'temp'
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution {resolution!r}, expected one of {list(RESOLUTIONS)}")
+    rng = np.random.default_rng(seed)
+    per_hour = RESOLUTIONS[resolution]
+    n = n_weeks * 7 * 24 * per_hour
+    dt = pl.datetime_range(start, start + pl.duration(hours=n_weeks * 7 * 24), resolution,
+                           eager=True, closed='left')
+    hours = np.arange(n) / per_hour
+    hour_of_day = hours % 24
+    weekend = (hours // 24 % 7) >= 5
+    day_of_year = (start.timetuple().tm_yday + hours / 24) % 365
+
+    # The outside temperature is shared by all meters
+    weather = np.cumsum(rng.normal(0, 0.05, n))
+    weather -= np.linspace(0, weather[-1], n)
+    temp = (10 - 8 * np.cos(2 * np.pi * (day_of_year - 15) / 365)
+            - 3 * np.cos(2 * np.pi * (hour_of_day - 3) / 24) + weather)
+
+    # Morning and evening peaks, two hours later on weekends
+    shift = np.where(weekend, 2.0, 0.0)
+    profile = (np.exp(-0.5 * ((hour_of_day - 7.5 - shift) / 1.2) ** 2)
+               + 1.5 * np.exp(-0.5 * ((hour_of_day - 19 - shift / 2) / 2.0) ** 2))
+    heating = np.clip(15 - temp, 0, None)
+
+    base = rng.uniform(0.1, 0.4, (n_meters, 1))
+    peak = rng.uniform(0.5, 2.5, (n_meters, 1))
+    heated = rng.uniform(0, 0.1, (n_meters, 1))
+    cons = base + peak * profile + heated * heating + rng.gamma(1.0, 0.15, (n_meters, n))
+    cons[rng.random((n_meters, n)) < 0.01] = 0.0
+    # Energy per reading, so the resolutions describe the same load
+    cons = np.round(cons / per_hour, 3)
+
+    return pl.DataFrame({
+        'meter_id': np.repeat([f'meter_{i:04d}' for i in range(n_meters)], n),
+        'dt': pl.concat([dt] * n_meters, rechunk=True),
+        'cons': cons.ravel(),
+        'temp': np.tile(np.round(temp, 1), n_meters),
+    })
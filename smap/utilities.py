@@ -2,10 +2,172 @@ import polars as pl
 import numpy as np
 from statsmodels.tsa.stattools import acf
 from typing import List
+from datetime import timedelta
 
 def calculate_lags_for_3h(df):
-    # Calculate the time difference between the first two points to determine the frequency
-    time_diff = df['dt'][1] - df['dt'][0]
-    # Calculate the number of lags needed for a 3-hour period
-    lags = int(3 * 60 / time_diff.total_seconds() * 60)
-    return lags
\ No newline at end of file
+    # Number of readings in 3 hours at the modal sampling interval of the readings
+    return int(3 * 60 * 60 / sampling_interval(df).total_seconds())
+
+
+# sampling interval assumed for meters with too few readings to detect it
+DEFAULT_RESOLUTION = timedelta(minutes=15)
+
+
+def _resolution(id_col=None):
+    # Expression for the modal positive step between the sorted timestamps, in
+    # seconds, per meter when id_col is given; robust to gaps and duplicates
+    steps = pl.col('dt').sort().diff().dt.total_seconds()
+    resolution = steps.filter(steps > 0).mode().min()
+    if id_col is not None:
+        resolution = resolution.over(id_col)
+    return resolution.fill_null(int(DEFAULT_RESOLUTION.total_seconds()))
+
+
+def sampling_interval(df):
+    """
+    Detects the sampling interval of a series as the most common step between
+    its sorted timestamps.
+
+    :param df: Polars DataFrame or LazyFrame with a 'dt' column
+    :return: datetime.timedelta, DEFAULT_RESOLUTION for fewer than two readings
+    """
+    resolution = df.select(_resolution().alias('resolution'))
+    if isinstance(resolution, pl.LazyFrame):
+        resolution = resolution.collect()
+    return timedelta(seconds=int(resolution['resolution'][0]))
+
+
+def with_resolution(df, id_col=None):
+    # Add the sampling interval of every meter in seconds as column 'resolution', reusing it when present
+    if 'resolution' in df.columns:
+        return df
+    return df.with_columns(_resolution(id_col).alias('resolution'))
+
+
+def add_resolution(df, id_col=None):
+    """
+    Adds the sampling interval of every meter, in seconds, as column
+    'resolution' to a DataFrame with a datetime column 'dt'. Features with
+    windows defined in hours (lowess peaks, STL, autocorrelation) size them
+    from this column, and reuse it when present instead of detecting the
+    interval again, so a fleet mixing 15, 30 and 60 minute meters can be
+    enriched once up front.
+
+    :param df: Polars DataFrame or LazyFrame with a 'dt' column
+    :param id_col: optional meter identifier column, the interval is then detected per meter
+    :return: Polars DataFrame or LazyFrame with the 'resolution' column added
+    """
+    return with_resolution(df, id_col=id_col)
+
+
+def readings(duration, resolution):
+    # Number of whole readings in a duration, for resolutions in seconds (a number, array or expression)
+    seconds = duration.total_seconds()
+    if isinstance(resolution, pl.Expr):
+        return (seconds / resolution).floor().cast(pl.Int64)
+    return np.floor(seconds / np.asarray(resolution, dtype=np.float64)).astype(np.int64)
+
+
+def week_keys(week_key=False):
+    """
+    Calendar columns identifying a week. By default these are the calendar
+    'year' and the ISO 'week'. With week_key they are the single Int32
+    column 'week_key' (ISO year * 100 + ISO week, e.g. 202252). The packed
+    key sorts in time, so weekly group-bys and joins work on one integer
+    column. The days around new year also get the ISO year of their week:
+    1 January 2023 belongs to 202252 rather than to the key (2023, 52).
+
+    :param week_key: use the packed 'week_key'
+    :return: list of column names
+    """
+    return ["week_key"] if week_key else ["year", "week"]
+
+
+def unpack_week_key(df):
+    """
+    Adds the ISO 'year' and 'week' of the packed 'week_key' column.
+
+    :param df: Polars DataFrame or LazyFrame with a 'week_key' column
+    :return: Polars DataFrame or LazyFrame with 'year' and 'week' added
+    """
+    return df.with_columns([
+        (pl.col('week_key') // 100).cast(pl.Int32).alias('year'),
+        (pl.col('week_key') % 100).cast(pl.Int8).alias('week'),
+    ])
+
+
+def group_keys(id_col=None, *extra, week_key=False):
+    # Weekly grouping keys, prefixed by the meter identifier when one is given
+    keys = week_keys(week_key)
+    if id_col is not None:
+        keys = [id_col] + keys
+    return keys + list(extra)
+
+
+# calendar columns derived from 'dt'; polars already returns compact dtypes
+# for them (Int32 year, Int8 week/weekday/hour/day)
+CALENDAR = {
+    'year': lambda: pl.col('dt').dt.year(),
+    'week': lambda: pl.col('dt').dt.week(),
+    'week_key': lambda: (pl.col('dt').dt.iso_year() * 100 + pl.col('dt').dt.week()).cast(pl.Int32),
+    'weekday': lambda: pl.col('dt').dt.weekday(),
+    'hour': lambda: pl.col('dt').dt.hour(),
+    'day': lambda: pl.col('dt').dt.day(),
+    'time': lambda: pl.col('dt').dt.time(),
+}
+
+
+def with_calendar(df, *columns):
+    # Add the requested calendar columns, reusing the ones already present
+    present = set(df.columns)
+    missing = [CALENDAR[col]().alias(col) for col in columns if col not in present]
+    if not missing:
+        return df
+    return df.with_columns(missing)
+
+
+def add_calendar(df, columns=None, week_key=False):
+    """
+    Adds the calendar columns used by the features ('year' and 'week', or
+    'week_key' with week_key, 'weekday', 'hour', 'day' and 'time') to a
+    DataFrame with a datetime column 'dt'.
+    Features reuse these columns when present instead of decoding 'dt' again,
+    so enriching a large input once saves a datetime decode per feature.
+
+    :param df: Polars DataFrame or LazyFrame with a 'dt' column
+    :param columns: calendar columns to add, defaults to all the features use
+    :param week_key: add the packed 'week_key' instead of 'year' and 'week', see week_keys
+    :return: Polars DataFrame or LazyFrame with the calendar columns added
+    """
+    if columns is None:
+        columns = week_keys(week_key) + ['weekday', 'hour', 'day', 'time']
+    return with_calendar(df, *columns)
+
+
+# dtypes of the compact memory layout, see compact_layout; Polars already decodes 'week',
+# 'weekday', 'hour' and 'day' into one byte, so the savings come from the
+# values, the year and the resolution
+COMPACT_DTYPES = {
+    'cons': pl.Float32,
+    'temp': pl.Float32,
+    'year': pl.UInt16,
+    'week': pl.UInt8,
+    'weekday': pl.UInt8,
+    'hour': pl.UInt8,
+    'day': pl.UInt8,
+    'resolution': pl.Int32,
+}
+
+
+def compact_layout(df):
+    """
+    Casts the readings and the calendar columns present in a DataFrame to the
+    compact layout of COMPACT_DTYPES: Float32 'cons' and 'temp', UInt16
+    'year' and UInt8 'week', 'weekday', 'hour' and 'day'. The features reuse
+    these columns as they are, so apply it after add_calendar; see the README
+    for the precision of every feature in this layout.
+
+    :param df: Polars DataFrame or LazyFrame
+    :return: Polars DataFrame or LazyFrame with the compact columns
+    """
+    return df.with_columns([pl.col(col).cast(dtype) for col, dtype in COMPACT_DTYPES.items() if col in df.columns])
@@ -0,0 +1,71 @@
+import polars as pl
+from datetime import timedelta
+from .engine import calc_features_fused
+from .module import calc_temperature_correlations, resample_hourly
+from .registry import AGG, FEATURES
+from .utilities import group_keys
+
+# features of the registry that read the temperature
+WEATHER_FEATURES = [name for name, feature in FEATURES.items() if 'temp' in feature.inputs]
+
+
+# function inputs meter readings, station weather and the station of every meter, outputs the weekly weather features
+def calc_weather_features(df, weather, stations, features=None, id_col='meter_id', station_col='station_id',
+                          tolerance=timedelta(hours=1)):
+    """
+    Computes the weather features of meters that share the temperature of a
+    weather station, without copying the temperature series of a station
+    onto the readings of each of its meters. The temperature is looked up
+    with a backward as-of join once per station and timestamp, at the
+    resolution each feature reads: the readings for w_temp_cor_overall and
+    the hourly resample (see resample_hourly) for the other regressions.
+    Only then is it joined onto the meters of the station. Where the station
+    records the temperature at the timestamps of the readings, the features
+    equal those of the readings with that temperature in a 'temp' column.
+
+    :param df: Polars DataFrame or LazyFrame with id_col, 'dt' and 'cons' columns
+    :param weather: Polars DataFrame or LazyFrame with station_col, 'dt' and 'temp' columns
+    :param stations: Polars DataFrame or LazyFrame with the station_col of every id_col
+    :param features: names of WEATHER_FEATURES to compute, defaults to all of them
+    :param id_col: meter identifier column
+    :param station_col: station identifier column of weather and stations
+    :param tolerance: oldest weather reading used for a timestamp, None for no limit
+    :return: Polars DataFrame (LazyFrame for a LazyFrame df) with one row per
+        meter and week and one column per feature
+    """
+    if features is None:
+        features = WEATHER_FEATURES
+    unknown = [name for name in features if name not in WEATHER_FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown weather features {unknown}, expected any of {WEATHER_FEATURES}")
+    keys = group_keys(id_col)
+    stations = stations.lazy().select(id_col, station_col)
+    weather = weather.lazy().select(station_col, 'dt', 'temp').sort('dt')
+    readings = df.lazy().select(id_col, 'dt', 'cons')
+
+    frames = []
+    fused = [name for name in features if FEATURES[name].stage == AGG]
+    if fused:
+        # w_temp_cor_overall correlates the readings themselves
+        raw = readings.join(stations, on=id_col, how='left', coalesce=True)
+        raw = _with_temperature(raw, weather, station_col, tolerance)
+        frames.append(calc_features_fused(raw, fused, id_col=id_col))
+    columns = [FEATURES[name].column for name in features if FEATURES[name].stage != AGG]
+    if columns:
+        # The regressions only need the temperature of every hour
+        hourly = resample_hourly(readings, id_col=id_col).join(stations, on=id_col, how='left', coalesce=True)
+        hourly = _with_temperature(hourly, weather, station_col, tolerance)
+        frames.append(calc_temperature_correlations(hourly, columns=columns, id_col=id_col, resample=False))
+
+    result = frames[0]
+    for frame in frames[1:]:
+        result = result.join(frame, on=keys, how='full', coalesce=True)
+    result = result.select(keys + [FEATURES[name].column for name in features]).sort(keys)
+    return result if isinstance(df, pl.LazyFrame) else result.collect()
+
+
+def _with_temperature(df, weather, station_col, tolerance):
+    # Station temperature of every row, looked up once per station and timestamp
+    lookups = df.select(station_col, 'dt').unique().sort('dt').join_asof(
+        weather, on='dt', by=station_col, strategy='backward', tolerance=tolerance)
+    return df.join(lookups, on=[station_col, 'dt'], how='left', coalesce=True)
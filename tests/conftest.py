@@ -0,0 +1,21 @@
+import numpy as np
+import polars as pl
+import pytest
+from datetime import datetime
+from smap.synthetic import synthetic_readings
+
+
+@pytest.fixture
+def readings():
+    """
+    Factory of synthetic readings, see smap.synthetic.synthetic_readings.
+
+    Without meters it returns the 'dt', 'cons' and 'temp' columns of a single
+    meter, otherwise the readings of one meter per name in a 'meter_id' column.
+    """
+    def make(meters=None, n_weeks=2, resolution='15m', start=datetime(2023, 1, 2), seed=0):
+        df = synthetic_readings(len(meters) if meters else 1, n_weeks, resolution, start, seed)
+        if meters is None:
+            return df.drop('meter_id')
+        return df.with_columns(pl.Series('meter_id', np.repeat(meters, df.height // len(meters))))
+    return make
@@ -0,0 +1,13 @@
+import pytest
+from smap.synthetic import synthetic_readings
+from smap.helpers import calc_features_consumption
+
+
+@pytest.mark.parametrize('resolution, per_week', [('15m', 672), ('30m', 336), ('1h', 168)])
+def test_synthetic_readings(resolution, per_week):
+    df = synthetic_readings(n_meters=2, n_weeks=2, resolution=resolution)
+    assert df.height == 2 * 2 * per_week
+    assert df['cons'].min() >= 0 and df['temp'].null_count() == 0
+    features = calc_features_consumption(df, id_col='meter_id')
+    assert features.select(['meter_id', 'year', 'week']).rows() == [
+        ('meter_0000', 2023, 1), ('meter_0000', 2023, 2), ('meter_0001', 2023, 1), ('meter_0001', 2023, 2)]
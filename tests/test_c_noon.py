@@ -1,30 +1,47 @@
 import polars as pl
-import pytest
+from datetime import datetime
 from smap import c_noon
 
 
-def test_c_noon():
-    # Sample data
+def _sample_df():
+    # Sample data; 1 January 2023 is a Sunday of the last ISO week of 2022
     data = {
-        'dt': ['2023-01-01 10:30', '2023-01-01 11:00', '2023-01-08 13:00', '2023-01-09 12:00'],
+        'dt': [datetime(2023, 1, 1, 10, 30), datetime(2023, 1, 1, 11), datetime(2023, 1, 8, 13),
+               datetime(2023, 1, 9, 12)],
         'cons': [15, 25, 35, 45]
     }
-    df = pl.DataFrame(data)
+    return pl.DataFrame(data)
+
 
-    # Expected output
+def test_c_noon():
+    df = _sample_df()
+
+    # Expected output; the calendar year is paired with the ISO week
     expected_data = {
-        'year': [2023, 2023],
-        'week': [52, 2],
-        'average_cons': [20.0, 40.0]  # Average for each week
+        'year': [2023, 2023, 2023],
+        'week': [1, 2, 52],
+        'average_cons_noon': [35.0, 45.0, 20.0]  # Average for each week
     }
-    expected_df = pl.DataFrame(expected_data)
+    expected_df = pl.DataFrame(expected_data,
+                               schema={'year': pl.Int32, 'week': pl.Int8, 'average_cons_noon': pl.Float64})
 
     # Run the c_noon function
-    result_df = c_noon(df)
+    result_df = c_noon(df).sort(['year', 'week'])
 
     # Assert the result is as expected
-    assert result_df.frame_equal(expected_df)
+    assert result_df.equals(expected_df)
+
+
+def test_c_noon_week_key():
+    df = _sample_df()
+
+    # Expected output, keyed by the packed ISO week
+    expected_data = {
+        'week_key': [202252, 202301, 202302],
+        'average_cons_noon': [20.0, 35.0, 45.0]  # Average for each week
+    }
+    expected_df = pl.DataFrame(expected_data, schema={'week_key': pl.Int32, 'average_cons_noon': pl.Float64})
 
-# Run the test
-pytest.main()
+    result_df = c_noon(df, week_key=True).sort('week_key')
 
+    assert result_df.equals(expected_df)
@@ -0,0 +1,42 @@
+import polars as pl
+import smap
+from datetime import datetime
+from polars.testing import assert_frame_equal
+from smap.helpers import calc_features_consumption
+from smap.utilities import add_calendar, unpack_week_key
+
+
+def test_features_reuse_calendar_columns(readings):
+    df = readings()
+    enriched = add_calendar(df)
+    assert enriched.schema['week'] == pl.Int8
+    for name in smap.__all__:
+        feature = getattr(smap, name)
+        expected = feature(df).sort(['year', 'week'])
+        got = feature(enriched).sort(['year', 'week'])
+        assert_frame_equal(got, expected, rtol=1e-9)
+
+
+def test_packed_week_key(readings):
+    # 1 January 2023 is a Sunday and belongs to the last ISO week of 2022
+    df = readings(start=datetime(2023, 1, 1), seed=5).drop('temp')
+    subset = ['c_week', 's_q2', 'r_mean_max_no_min', 's_cor', 'ts_acf_mean3h']
+    result = calc_features_consumption(df, features=subset, week_key=True)
+    assert result.schema['week_key'] == pl.Int32
+    assert result['week_key'].to_list() == [202252, 202301, 202302]
+    assert smap.c_week(df, week_key=True)['week_key'].sort().to_list() == [202252, 202301, 202302]
+    # Away from new year both keys give the same weeks
+    expected = calc_features_consumption(df.filter(pl.col('dt') >= datetime(2023, 1, 2)), features=subset)
+    got = unpack_week_key(result).filter(pl.col('week_key') > 202252).select(expected.columns)
+    assert_frame_equal(got, expected, check_dtypes=False, rtol=1e-9)
+
+
+def test_packed_week_key_keeps_the_weeks_of_null_meters(readings):
+    fleet = readings(['a', None, 'b'], seed=6).drop('temp')
+    subset = ['c_week', 's_q2', 'r_mean_max_no_min', 'ts_acf_mean3h']
+    expected = calc_features_consumption(fleet, id_col='meter_id', features=subset)
+    result = unpack_week_key(calc_features_consumption(fleet, id_col='meter_id', features=subset, week_key=True))
+    keys = ['meter_id', 'year', 'week']
+    assert result.select(keys).rows() == [(None, 2023, 1), (None, 2023, 2), ('a', 2023, 1), ('a', 2023, 2),
+                                          ('b', 2023, 1), ('b', 2023, 2)]
+    assert_frame_equal(result.select(expected.columns).sort(keys), expected.sort(keys), check_dtypes=False, rtol=1e-9)
@@ -0,0 +1,21 @@
+import smap
+from smap.engine import FUSED_FEATURES, calc_features_fused, derive_features
+from smap.registry import AGG, DERIVED, FEATURES
+
+
+def test_fused_matches_single_features(readings):
+    df = readings().drop('temp')
+    fused = calc_features_fused(df).sort(['year', 'week'])
+    for name in FUSED_FEATURES:
+        expected = getattr(smap, name)(df).sort(['year', 'week'])
+        column = FEATURES[name].column
+        assert fused.select(['year', 'week', column]).equals(expected.select(['year', 'week', column])), name
+
+
+def test_derived_features_from_cached_aggregates(readings):
+    df = readings().drop('temp')
+    base = [name for name in FUSED_FEATURES if FEATURES[name].stage == AGG]
+    weekly = calc_features_fused(df, base)
+    derived = [name for name in FUSED_FEATURES if FEATURES[name].stage == DERIVED]
+    expected = calc_features_fused(df, derived).sort(['year', 'week'])
+    assert derive_features(weekly, derived).sort(['year', 'week']).equals(expected)
@@ -0,0 +1,33 @@
+import polars as pl
+from smap import c_evening, s_num_peaks, w_temp_cor_night
+
+
+def test_features_per_meter(readings):
+    meters = {'a': readings(n_weeks=1, seed=0), 'b': readings(n_weeks=1, seed=1)}
+    fleet = pl.concat([df.with_columns(pl.lit(m).alias('meter_id')) for m, df in meters.items()])
+    for feature in [c_evening, s_num_peaks, w_temp_cor_night]:
+        result = feature(fleet, id_col='meter_id')
+        assert result.columns[0] == 'meter_id'
+        for meter_id, df in meters.items():
+            expected = feature(df)
+            got = result.filter(pl.col('meter_id') == meter_id).drop('meter_id')
+            assert got.equals(expected), feature.__name__
+
+
+def test_mixed_resolutions(readings):
+    from smap import ts_acf_mean3h, ts_stl_varRem
+    from smap.utilities import add_resolution
+    meters = {resolution: readings([resolution], n_weeks=1, resolution=resolution, seed=i)
+              for i, resolution in enumerate(['15m', '30m', '1h'])}
+    fleet = add_resolution(pl.concat(list(meters.values())), id_col='meter_id')
+    assert fleet.group_by('meter_id').agg(pl.col('resolution').first()).sort('resolution').rows() == [
+        ('15m', 900), ('30m', 1800), ('1h', 3600)]
+    for feature in [s_num_peaks, ts_stl_varRem, ts_acf_mean3h]:
+        result = feature(fleet, id_col='meter_id')
+        for resolution, df in meters.items():
+            expected = feature(df.drop('meter_id'))
+            got = result.filter(pl.col('meter_id') == resolution).drop('meter_id')
+            assert got.equals(expected), (feature.__name__, resolution)
+    # An hourly week still has the 60 hours of readings the peak counts need
+    peaks = s_num_peaks(meters['1h'].drop('meter_id'))
+    assert peaks['num_peaks'][0] > 0
@@ -0,0 +1,97 @@
+import warnings
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+from smap.helpers import (WORKING_SET_FACTOR, align_features, calc_features_consumption, calc_features_parquet,
+                          profile_features)
+
+
+def test_align_features():
+    frames = {
+        'a': pl.DataFrame({'year': [2023, 2023], 'week': [2, 1], 'x': [2.0, 1.0]}),
+        'b': pl.DataFrame({'year': [2023], 'week': [2], 'y': [20.0]}),
+    }
+    expected = pl.DataFrame({'year': [2023, 2023], 'week': [1, 2], 'x': [1.0, 2.0], 'y': [None, 20.0]})
+    with pytest.warns(UserWarning, match="'b'"):
+        assert align_features(frames).equals(expected)
+    # Threshold features are expected to miss weeks
+    sparse = {'a': frames['a'], 't_above_1kw': frames['b']}
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        align_features(sparse)
+    frames['c'] = pl.DataFrame({'year': [2023, 2023], 'week': [1, 1], 'z': [0.0, 1.0]})
+    with pytest.raises(ValueError, match="'c'"):
+        align_features(frames)
+
+
+def test_calc_features_parquet(tmp_path, readings):
+    fleet = readings(['a', 'b', 'c']).drop('temp')
+    fleet.write_parquet(tmp_path / 'readings.parquet')
+    # A budget of roughly one meter per chunk
+    paths = calc_features_parquet(str(tmp_path / 'readings.parquet'), str(tmp_path / 'features'),
+                                  id_col='meter_id', memory_budget=fleet.height * 8 * WORKING_SET_FACTOR)
+    assert len(paths) == 3
+    keys = ['meter_id', 'year', 'week']
+    result = pl.read_parquet(str(tmp_path / 'features' / '*.parquet')).sort(keys)
+    assert_frame_equal(result, calc_features_consumption(fleet, id_col='meter_id').sort(keys), rtol=1e-9)
+
+
+def test_calc_features_parquet_reads_only_the_files_of_a_chunk(tmp_path, monkeypatch, readings):
+    fleet = readings(['a', 'b', 'c'], n_weeks=1).drop('temp')
+    for (meter,), df in fleet.group_by(['meter_id']):
+        df.write_parquet(tmp_path / f'{meter}.parquet')
+    scanned = []
+    scan_parquet = pl.scan_parquet
+
+    def spy(source, **kwargs):
+        scanned.append(source)
+        return scan_parquet(source, **kwargs)
+    monkeypatch.setattr(pl, 'scan_parquet', spy)
+    paths = calc_features_parquet(str(tmp_path / '*.parquet'), str(tmp_path / 'features'), id_col='meter_id',
+                                  memory_budget=fleet.height * 8 * WORKING_SET_FACTOR)
+    assert len(paths) == 3
+    # Every chunk only scans the file of its meter
+    assert [source for source in scanned if isinstance(source, list)] == [
+        [str(tmp_path / f'{meter}.parquet')] for meter in ['a', 'b', 'c']
+    ]
+
+
+def test_calc_features_consumption_workers(readings):
+    fleet = readings(['c', 'a', 'b'], seed=1).drop('temp')
+    result = calc_features_consumption(fleet, id_col='meter_id', n_workers=2)
+    assert result['meter_id'].to_list() == ['a', 'a', 'b', 'b', 'c', 'c']
+    assert_frame_equal(result, calc_features_consumption(fleet, id_col='meter_id'), rtol=1e-9)
+
+
+def test_profile_features(readings):
+    df = readings(n_weeks=1, seed=2).drop('temp')
+    features, profile = profile_features(df)
+    assert_frame_equal(features, calc_features_consumption(df), rtol=1e-9)
+    assert profile['name'].to_list()[-1] == 'align_features'
+    peaks = profile.filter(pl.col('name') == 'calc_lowess_peaks').row(0, named=True)
+    assert peaks['input_rows'] == df.height and peaks['udf_calls'] == 1 and peaks['udf_weeks'] == 1
+    assert peaks['columns'] == ['num_peaks', 'num_small_peaks', 'num_big_peaks']
+    # Compact and packed key runs are profiled too
+    features, profile = profile_features(df, compact=True, week_key=True)
+    assert_frame_equal(features, calc_features_consumption(df, compact=True, week_key=True), rtol=1e-9)
+    assert features.columns[0] == 'week_key' and features.schema['average_cons'] == pl.Float32
+
+
+def test_feature_subset(readings):
+    df = readings(n_weeks=1, seed=3).drop('temp')
+    subset = ['r_mean_max_no_min', 's_num_peaks', 't_width_peaks', 's_number_big_peaks']
+    result, profile = profile_features(df, features=subset)
+    assert result.columns == ['year', 'week', 'ratio_mean_max_no_min', 'num_peaks', 't_width_peaks', 'num_big_peaks']
+    assert_frame_equal(result, calc_features_consumption(df).select(result.columns), rtol=1e-9)
+    assert profile['name'].to_list() == ['fused', 'calc_lowess_peaks', 'calc_wide_peaks', 'align_features']
+    with pytest.raises(ValueError):
+        calc_features_consumption(df, features=['no_such_feature'])
+
+
+def test_compact_layout(readings):
+    df = readings(seed=4).drop('temp')
+    subset = ['c_week', 's_q2', 'r_mean_max_no_min', 's_cor', 'ts_acf_mean3h']
+    result = calc_features_consumption(df, features=subset, compact=True)
+    assert result.schema['year'] == pl.UInt16 and result.schema['average_cons'] == pl.Float32
+    expected = calc_features_consumption(df, features=subset)
+    assert_frame_equal(result, expected, check_dtypes=False, rtol=1e-5)
@@ -0,0 +1,20 @@
+import polars as pl
+from datetime import datetime
+from polars.testing import assert_frame_equal
+from smap.helpers import calc_features_consumption
+from smap.incremental import read_features, update_features
+
+
+def test_update_features_matches_full_history(tmp_path, readings):
+    fleet = readings(['a', 'b']).drop('temp')
+    store = str(tmp_path / 'store')
+    update_features(fleet.filter(pl.col('dt') < datetime(2023, 1, 12)), store, id_col='meter_id')
+    # One more day of meter 'a' only touches its second week
+    new = fleet.filter((pl.col('dt') >= datetime(2023, 1, 12)) & (pl.col('meter_id') == 'a')
+                       & (pl.col('dt') < datetime(2023, 1, 13)))
+    updated = update_features(new, store, id_col='meter_id')
+    assert updated.select(['meter_id', 'year', 'week']).rows() == [('a', 2023, 2)]
+    update_features(fleet.filter(pl.col('dt') >= datetime(2023, 1, 12)), store, id_col='meter_id')
+    keys = ['meter_id', 'year', 'week']
+    expected = calc_features_consumption(fleet, id_col='meter_id').sort(keys)
+    assert_frame_equal(read_features(store).collect().sort(keys), expected, rtol=1e-9)
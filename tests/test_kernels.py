@@ -0,0 +1,79 @@
+import numpy as np
+from statsmodels.nonparametric.smoothers_lowess import lowess
+from statsmodels.tsa.seasonal import STL
+from statsmodels.tsa.stattools import acf
+from smap.kernels import acf_mean, correlation_matrices, count_peaks, lowess_batch, lowess_peaks, stl_remainder_variance, wide_peaks
+
+
+def test_lowess_batch_matches_statsmodels():
+    rng = np.random.default_rng(0)
+    y = rng.gamma(1.0, 0.5, (20, 480))
+    y[::3, 10:60] = 0.0
+    for frac in [0.02, 0.05]:
+        expected = np.array([lowess(row, np.arange(480), frac=frac)[:, 1] for row in y])
+        assert np.array_equal(lowess_batch(y, frac), expected)
+
+
+def test_lowess_peaks_with_missing_values():
+    rng = np.random.default_rng(1)
+    values = rng.gamma(1.0, 0.5, 720)
+    values[300] = np.nan
+    counts = lowess_peaks(values, [0, 240, 480], 240, 0.02)
+    for count, start in zip(counts, [0, 240, 480]):
+        data = values[start:start + 240]
+        smoothed = lowess(data, np.arange(240), frac=0.02)[:, 1]
+        assert count == count_peaks(smoothed[None, :])[0]
+
+
+def test_acf_mean_matches_statsmodels():
+    rng = np.random.default_rng(2)
+    lengths = np.array([672, 480, 96, 5, 1])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    values = rng.gamma(1.0, 0.5, lengths.sum())
+    values[700] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = [np.mean(acf(values[s:s + n], nlags=12, fft=True, missing='conservative')[1:])
+                    for s, n in zip(starts, lengths)]
+    assert np.allclose(acf_mean(values, starts, lengths, 12), expected, rtol=1e-10, equal_nan=True)
+
+
+def test_stl_remainder_variance_modes():
+    rng = np.random.default_rng(3)
+    lengths = np.array([672, 168, 672, 96])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    values = rng.gamma(1.0, 0.5, lengths.sum())
+    expected = [np.var(STL(values[s:s + n], period=52).fit().resid) for s, n in zip(starts, lengths)]
+    assert np.array_equal(stl_remainder_variance(values, starts, lengths), expected)
+    assert np.array_equal(stl_remainder_variance(values, starts, lengths, n_workers=2), expected)
+    for method in ['stl_fast', 'moving_average']:
+        approx = stl_remainder_variance(values, starts, lengths, method=method)
+        assert np.all(np.isfinite(approx)) and np.all(approx > 0)
+
+
+def test_wide_peaks_matches_run_loop():
+    rng = np.random.default_rng(4)
+    lengths = np.array([672, 5, 1, 96])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    values = rng.gamma(1.0, 0.5, lengths.sum())
+    thresholds = [0.5 * values[s:s + n].max() for s, n in zip(starts, lengths)]
+    width, mean_width = wide_peaks(values, starts, lengths, thresholds)
+    for i, (s, n) in enumerate(zip(starts, lengths)):
+        d_peaks, run = [2], 0
+        for above in list(values[s:s + n] > thresholds[i]) + [False]:
+            if above:
+                run += 1
+            else:
+                if run > 1:
+                    d_peaks.append(run)
+                run = 0
+        assert width[i] == sum(d_peaks) and mean_width[i] == np.mean(d_peaks)
+
+
+def test_correlation_matrices_match_corrcoef():
+    rng = np.random.default_rng(5)
+    lengths = np.array([96, 24, 3])
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    values = rng.gamma(1.0, 0.5, (lengths.sum(), 7))
+    matrices = correlation_matrices(values, starts, lengths)
+    for matrix, s, n in zip(matrices, starts, lengths):
+        assert np.allclose(matrix, np.corrcoef(values[s:s + n].T), rtol=1e-12)
@@ -0,0 +1,16 @@
+import os
+import polars as pl
+from smap.parallel import map_frames
+
+
+def _thread_pool_size(frame):
+    return pl.DataFrame({'threads': [pl.thread_pool_size()]})
+
+
+def test_map_frames_limits_the_threads_of_the_workers(monkeypatch):
+    monkeypatch.delenv('POLARS_MAX_THREADS', raising=False)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+    results = map_frames(_thread_pool_size, [pl.DataFrame({'a': [i]}) for i in range(4)], n_workers=2)
+    assert [result['threads'][0] for result in results] == [4, 4, 4, 4]
+    # Only the workers get the limit
+    assert 'POLARS_MAX_THREADS' not in os.environ
@@ -0,0 +1,31 @@
+import polars as pl
+import smap
+from polars.testing import assert_frame_equal
+from smap.registry import FEATURES, resolve
+
+
+def test_registry_lists_all_features():
+    assert list(FEATURES) == smap.__all__
+
+
+def test_registry_columns_and_dtypes(readings):
+    df = readings()
+    for name, feature in FEATURES.items():
+        result = getattr(smap, name)(df)
+        assert feature.column in result.columns, name
+        assert result.schema[feature.column] == feature.dtype, name
+
+
+def test_features_keep_lazy_frames_lazy(readings):
+    df = readings()
+    for name in smap.__all__:
+        feature = getattr(smap, name)
+        result = feature(df.lazy())
+        assert isinstance(result, pl.LazyFrame), name
+        assert_frame_equal(result.collect().sort(['year', 'week']), feature(df).sort(['year', 'week']))
+
+
+def test_resolve_orders_dependencies():
+    plan = [feature.name for feature in resolve(['r_mean_max_no_min', 'c_week'])]
+    assert plan.index('s_min') < plan.index('c_week_no_min') < plan.index('r_mean_max_no_min')
+    assert plan.count('c_week') == 1
@@ -0,0 +1,26 @@
+import asyncio
+import polars as pl
+from polars.testing import assert_frame_equal
+from smap.engine import calc_features_fused
+from smap.streaming import astream_features, stream_features
+
+
+def test_stream_features_matches_batch(readings):
+    fleet = readings(['a', 'b']).sort('dt')
+    keys = ['meter_id', 'year', 'week']
+    expected = calc_features_fused(fleet, id_col='meter_id').sort(keys)
+    rows = list(stream_features(fleet.iter_rows()))
+    # The first weeks are closed by the readings of the second, the second ones by the end of the stream
+    assert [(row['meter_id'], row['week']) for row in rows] == [('a', 1), ('b', 1), ('a', 2), ('b', 2)]
+    assert_frame_equal(pl.DataFrame(rows, schema=expected.schema).sort(keys), expected)
+
+    async def records():
+        for record in fleet.iter_rows():
+            yield record
+
+    async def collect():
+        return [row async for row in astream_features(records(), features=['c_week', 'r_mean_max'])]
+
+    rows = asyncio.run(collect())
+    expected = expected.select(keys + ['average_cons', 'ratio_mean_max'])
+    assert_frame_equal(pl.DataFrame(rows, schema=expected.schema).sort(keys), expected)
@@ -0,0 +1,36 @@
+import numpy as np
+import polars as pl
+import smap
+from polars.testing import assert_frame_equal
+from smap.module import calc_linear_relationship, calc_temperature_correlations, linear_slope
+
+
+def test_linear_slope_matches_calc_linear_relationship():
+    rng = np.random.default_rng(0)
+    temp = rng.normal(5, 2, 50).tolist()
+    temp[10:20] = [4.0] * 10   # constant temperature
+    temp[20:30] = [0.0] * 10   # temperature all zero
+    temp[30] = None            # missing temperature
+    df = pl.DataFrame({
+        'group': np.repeat(np.arange(5), 10),
+        'temp': pl.Series(temp, dtype=pl.Float64),
+        'cons': rng.gamma(1.0, 0.5, 50),
+    })
+    result = df.group_by('group').agg(linear_slope('temp', 'cons').alias('slope')).sort('group')
+    for group, slope in zip(result['group'], result['slope']):
+        rows = df.filter(pl.col('group') == group)
+        expected = calc_linear_relationship([rows['temp'], rows['cons']])
+        if expected is None:
+            assert slope is None
+        else:
+            assert np.isclose(slope, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_temperature_correlations_share_the_resample(readings):
+    df = readings(['a', 'b'])
+    keys = ['meter_id', 'year', 'week']
+    result = calc_temperature_correlations(df.lazy(), id_col='meter_id').collect()
+    for name in ['w_temp_cor_night', 'w_temp_cor_daytime', 'w_temp_cor_evening', 'w_temp_cor_minima',
+                 'w_temp_cor_maxima', 'w_temp_cor_maxmin', 'w_temp_cor_weekday_weekend']:
+        expected = getattr(smap, name)(df, id_col='meter_id').sort(keys)
+        assert_frame_equal(result.select(expected.columns).sort(keys), expected, rtol=1e-9)
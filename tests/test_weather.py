@@ -0,0 +1,27 @@
+import polars as pl
+import pytest
+import smap
+from polars.testing import assert_frame_equal
+from smap.weather import WEATHER_FEATURES, calc_weather_features
+
+
+def test_calc_weather_features(readings):
+    df = readings(['m0', 'm1', 'm2'])
+    stations = pl.DataFrame({'meter_id': df['meter_id'].unique().sort(), 'station_id': ['a', 'a', 'b']})
+    # Station b is warmer; its temperature is only recorded every half hour
+    station_a = df.filter(pl.col('meter_id') == 'm0').select(pl.lit('a').alias('station_id'), 'dt', 'temp')
+    station_b = station_a.with_columns(pl.lit('b').alias('station_id'), pl.col('temp') + 3)
+    weather = pl.concat([station_a, station_b.filter(pl.col('dt').dt.minute().is_in([0, 30]))])
+    result = calc_weather_features(df.drop('temp'), weather, stations)
+    assert result.height == 6
+
+    # The same features on the readings with the temperature of their station copied onto them
+    joined = df.drop('temp').join(stations, on='meter_id')
+    joined = joined.join(weather, on=['station_id', 'dt'], how='left', coalesce=True)
+    joined = joined.with_columns(pl.col('temp').forward_fill().over('meter_id'))
+    keys = ['meter_id', 'year', 'week']
+    for name in WEATHER_FEATURES:
+        expected = getattr(smap, name)(joined, id_col='meter_id').sort(keys)
+        assert_frame_equal(result.select(expected.columns), expected, rtol=1e-9)
+    with pytest.raises(ValueError):
+        calc_weather_features(df.drop('temp'), weather, stations, features=['c_week'])
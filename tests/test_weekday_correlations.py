@@ -0,0 +1,12 @@
+import numpy as np
+from smap import s_cor, s_cor_wd, s_cor_we
+
+
+def test_weekday_correlations_pair_the_documented_days(readings):
+    df = readings(n_weeks=1)
+    # One row of readings per day, Monday first
+    days = df['cons'].to_numpy().reshape(7, -1)
+    consecutive = [np.corrcoef(days[i], days[i + 1])[0, 1] for i in range(6)]
+    assert np.isclose(s_cor(df)['mean_cor'][0], np.mean(consecutive))
+    assert np.isclose(s_cor_wd(df)['mean_cor_wd'][0], np.mean(consecutive[:4]))
+    assert np.isclose(s_cor_we(df)['mean_cor_we'][0], consecutive[5])